@@ -2,11 +2,18 @@ import streamlit as st
 from modules.page_processors import (
     run_forecasting_logic,
     run_current_events_logic,
-    run_biggest_movers_logic
+    run_biggest_movers_logic,
+    build_summary_messages,
+    build_chat_system_prompt,
+    report_consolidated_summary
 )
 import json
 import pandas as pd
-from modules.chatbot import chat_with_claude
+from modules.chatbot import CLAUDE_ERROR, stream_chat_with_claude
+from modules.data_store import load_table
+from modules.pipeline import StageFailed, run_pipeline
+from modules.prompt_builder import build_reference_context, describe_reference_stats
+from modules.result_processing import estimate_tokens
 
 st.set_page_config(page_title="Claritas AI Dashboard", layout="wide")
 
@@ -105,111 +112,11 @@ st.markdown("""
 st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
 
 # ---- Insight Summary Section and Other Data ----
-forecast_output = run_forecasting_logic()
-events_output = run_current_events_logic()
-movers_output = run_biggest_movers_logic()
-# Load PRIZM segments from JSON file
-with open("PelotonDashboard/data/prizm_descriptions.json", "r", encoding="utf-8") as f:
-    prizm_data = json.load(f)
-# Dma demographics
-dma_demographics = pd.read_csv("PelotonDashboard/data/dma_demo_region.csv")
+def load_prizm_profiles():
+    # Load PRIZM segments from JSON file
+    with open("PelotonDashboard/data/prizm_descriptions.json", "r", encoding="utf-8") as f:
+        return json.load(f)
 
-messages = [
-    {
-        "role": "user",
-        "content": f"""
-You are an executive marketing strategist AI advising Peloton.
-
-You have been provided with multiple AI-generated summaries and supporting data sources. Your job is to **synthesize all of it** into one clear, strategic marketing execution plan. The goal is to give a confident, executive-level recommendation that shows how Peloton is positioned in the industry, who their key audiences are, and what immediate actions they should take to grow and defend market share.
-
-Your response should be structured using the following format:
-
-<Required Output Structure>
-
-### **1. Market Synopsis**  
-Summarize Peloton's competitive standing and what's changing in the fitness industry.  
-This should integrate insights from historical/forecast trends and current events.
-
-- What's Peloton's momentum like?
-- What major shift is happening in the market?
-- Why now is a critical time to act?
-- Make a note about purchases.
-
-### **2. Audience Intelligence**  
-Identify 2-3 of the most important consumer segments or regions to target right now.  
-Base this on:
-- PRIZM segment movers (top gainers or losses)
-- DMA shifts (which cities/regions are changing most)
-- Relevance to the current events summary
-
-For each audience:
-- Name the segment/region
-- What behavior changed?
-- How should Peloton speak to them?
-
-### **3. Strategic Playbook**  
-Lay out a full-spectrum marketing plan across three time horizons:
-
-**Immediate Actions** (next 2-4 weeks):
-Tactical moves tied to current momentum, media cycles, or segment surges.
-
-**Quarterly Strategy** (2-3 months): 
-Positioning, product offers, or cross-platform tactics to convert attention into loyalty.
-
-**Long-Term Advantage** (6+ months):  
-Bold, long-view strategies to solidify Peloton as the market leader in premium connected fitness.
-
-### **4. Confidence Signals**  
-End with 3-5 bullet points that justify why this is the *right* plan based on data.  
-Each point should be based on either:  
-- Forecast/historical trends  
-- Segment behavior  
-- Regional demand changes  
-- Industry news
-
-</Required Output Structure>
-
----
-**Inputs to consider**:
-
-**1. Forecast Trend Summary** - AI output analyzing the company's performance and future trends.
-{forecast_output['forecast_summary']}
-
-**2. Historical Data Snapshot**  - Where the company's trends been in the last 30 days.
-{forecast_output['historical_snippet']}
-
-**3. Forecasted Engagement Data**  - What the future trend of teh company based on an time series model.
-{forecast_output['forecast_snippet']}
-
-**4. Current Events Summary**  - What the internet is saying about Peloton and the fitness industry.
-{events_output['event_summary']}
-
-**5. PRIZM Segment Specific Insights** - How current events may impact specific PRIZM segments.
-{events_output['prizm_insight']}
-
-**5. Demographic Movers Summary** - AI output summarizing the biggest movers in Peloton's DMA regions.
-{movers_output['movers_summary']}
-
-**6. PRIZM Segment Profile JSON**  - A detailed JSON profile of Peloton's PRIZM segments.
-{prizm_data}
-
-**7. DMA Demographic Overview**  - A CSV file containing demographic data for Peloton's DMA regions.
-{dma_demographics}
-
-Do not repeat the inputs verbatim. Instead, **distill and integrate**. Prioritize clarity, confidence, and strategic depth.
-
-Use a professional and executive tone. This is going straight to senior leadership at Peloton.
- 
-Use some insight from each of the inputs to create a comprehensive, actionable plan. Strait to the point.
-
-- Make sure to include some recommendation in the Quarterly Strategy that incorporates teh news about kettlebells.
-
-"""
-    }
-]
-
-
-consolidated_response = chat_with_claude(messages)
 
 st.markdown("""
 <div style='font-size: 24px; font-weight: 700; color: #F05A28; margin-top: 40px;'>
@@ -217,39 +124,87 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-st.markdown(f"""
+# Rendered as it streams in rather than after the whole completion; unchanged inputs are answered
+# from the reply cache unless a fresh summary is requested
+refresh_summary = st.button("Regenerate Summary")
+summary_placeholder = st.empty()
+
+
+def render_summary(text):
+    summary_placeholder.markdown(f"""
 <div class='detailed-analysis'>
-{consolidated_response}
+{text}
 </div>
 """, unsafe_allow_html=True)
 
-# --- Chatbot Section with Sticky Input and Memory ---
-from modules.chatbot import chat_with_claude
-
-# --- Initialize session state ---
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history = [
-        {
-            "role": "system",
-            "content": f"""
-You are Claritas AI, a strategic marketing assistant for Peloton. You specialize in interpreting forecasting data, regional trends, and consumer behavior to help executives make high-impact decisions.
 
-You have access to market forecasts, PRIZM segment insights, current events summaries, and an overall company breakdown given in the consolidated_response. Always respond with a confident, helpful tone — your goal is to translate data into action.
+def synthesize_summary(messages):
+    # With every input from the headless report, its summary is shown instead of a new synthesis
+    stored = None if refresh_summary else report_consolidated_summary()
+    if stored is not None:
+        render_summary(stored)
+        return stored
+
+    # Redrawn inside the styled block on every streamed piece
+    reply = ""
+    for piece in stream_chat_with_claude(messages, use_cache=not refresh_summary):
+        reply += piece
+        render_summary(reply)
+    if CLAUDE_ERROR in reply:
+        # Shown, but not kept as the summary, so the next rerun tries again
+        raise StageFailed(reply)
+    return reply
+
+
+# Each stage reruns only when one of its inputs produced a new version, so revisiting Home with
+# nothing new from the other pages skips the synthesis entirely
+HOME_STAGES = {
+    "forecast": ([], run_forecasting_logic),
+    "events": ([], run_current_events_logic),
+    "movers": ([], run_biggest_movers_logic),
+    "prizm_profiles": ([], load_prizm_profiles),
+    "dma_demographics": ([], lambda: load_table("dma_demo_region")),
+    "summary_reference": (["movers", "events", "prizm_profiles", "dma_demographics"], build_reference_context),
+    "summary_messages": (["forecast", "events", "movers", "summary_reference"], build_summary_messages),
+    "consolidated_summary": (["summary_messages"], synthesize_summary),
+    "chat_system_prompt": (["forecast", "events", "movers", "consolidated_summary"], build_chat_system_prompt)
+}
 
-Your responses should be concise, professional, and focused on actionable insights.
+try:
+    home_results, recomputed = run_pipeline(
+        HOME_STAGES,
+        ["consolidated_summary", "chat_system_prompt"],
+        st.session_state.setdefault("home_pipeline", {}),
+        force={"consolidated_summary"} if refresh_summary else ()
+    )
+    consolidated_response = home_results["consolidated_summary"]
+    if "consolidated_summary" not in recomputed:
+        render_summary(consolidated_response)
+except StageFailed as e:
+    # The chatbot still gets the page outputs, with the error in place of the summary
+    consolidated_response = str(e)
+    home_results, recomputed = run_pipeline(
+        HOME_STAGES, ["forecast", "events", "movers"], st.session_state["home_pipeline"]
+    )
+    home_results["chat_system_prompt"] = build_chat_system_prompt(
+        home_results["forecast"], home_results["events"], home_results["movers"], consolidated_response
+    )
+    recomputed.add("chat_system_prompt")
 
-Your task is to assist Peloton executives by providing clear, data-driven recommendations based on the latest insights, make sure they are thought out and are interesting. Give some details that are potentially too specific as idea starters.
+# Size of the prompt the summary was synthesized from
+home_store = st.session_state["home_pipeline"]
+st.caption(describe_reference_stats(
+    home_store["summary_reference"]["value"]["stats"],
+    estimate_tokens(home_store["summary_messages"]["value"][0]["content"])
+))
 
-Remember you are used as a brainstorming tool, give recommendations to spark intrigue in teh customer and ask for their input. If they sk for more information get even more specific or if they dont like it get take a step back. Get creative!
+# --- Chatbot Section with Sticky Input and Memory ---
 
-Here's the latest context:
-- Forecast Summary: {forecast_output['forecast_summary']}
-- Events: {events_output['event_summary']}
-- Movers: {movers_output['movers_summary']}
-- Main Summary and recommendations: {consolidated_response}
-"""
-        }
-    ]
+# --- Initialize session state; keep the system prompt in step with the latest summary ---
+if "chat_history" not in st.session_state:
+    st.session_state.chat_history = [{"role": "system", "content": home_results["chat_system_prompt"]}]
+elif "chat_system_prompt" in recomputed:
+    st.session_state.chat_history[0] = {"role": "system", "content": home_results["chat_system_prompt"]}
 if "chatbot_input_value" not in st.session_state:
     st.session_state.chatbot_input_value = ""
 
@@ -258,9 +213,8 @@ def handle_user_message():
     user_msg = st.session_state.chatbot_input_value.strip()
     if user_msg:
         st.session_state.chat_history.append({"role": "user", "content": user_msg})
-        with st.spinner("Thinking..."):
-            assistant_reply = chat_with_claude(st.session_state.chat_history)
-        st.session_state.chat_history.append({"role": "assistant", "content": assistant_reply})
+        # The reply is streamed below the chat history on the rerun this callback triggers
+        st.session_state.awaiting_reply = True
         st.session_state.chatbot_input_value = ""  # Clears input before next rerender
 
 # --- Section Header ---
@@ -274,6 +228,11 @@ for msg in st.session_state.chat_history[1:]:  # Skip system prompt
         st.markdown(f"<div style='color:#74C2E1; font-weight:bold;'>You:</div><div class='detailed-analysis'>{msg['content']}</div>", unsafe_allow_html=True)
     elif msg["role"] == "assistant":
         st.markdown(f"<div style='color:#F05A28; font-weight:bold;'>Claritas AI:</div><div class='detailed-analysis'>{msg['content']}</div>", unsafe_allow_html=True)
+if st.session_state.get("awaiting_reply"):
+    st.markdown("<div style='color:#F05A28; font-weight:bold;'>Claritas AI:</div>", unsafe_allow_html=True)
+    assistant_reply = st.write_stream(stream_chat_with_claude(st.session_state.chat_history))
+    st.session_state.chat_history.append({"role": "assistant", "content": assistant_reply})
+    st.session_state.awaiting_reply = False
 st.markdown("</div>", unsafe_allow_html=True)
 
 # --- Sticky Chat Input ---
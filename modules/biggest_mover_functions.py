@@ -1,35 +1,58 @@
-import pandas as pd
 import numpy as np
+import pandas as pd
+from scipy.special import erfc
 
+from modules.hit_cube import query_cube
+from modules.prizm_allocation import align_allocation, allocate, build_allocation
+
+
+def _cube_day_counts(cube, day, action):
+    """
+    Per-DMA hitCount on a single day, read from a hit cube.
+    """
+    counts = query_cube(cube, start=day, end=day, actions=action, by='dma')
+    counts.index.name = 'dma'
+    return counts
 
-import pandas as pd
-import numpy as np
 
-def dma_change(df: pd.DataFrame,
+def dma_change(df: pd.DataFrame = None,
                start_date: str = None,
                end_date: str = None,
                action: str = None,
                start_count: int = None,  # not used, just for interface compatibility
-               end_count: int = None) -> pd.DataFrame:
+               end_count: int = None,
+               cube: dict = None,
+               sort: bool = True) -> pd.DataFrame:
     """
     Computes start and end hitCounts and weighted percent change per DMA.
+    Pass a hit cube from modules.hit_cube instead of `df` to skip filtering the raw table,
+    and sort=False when the result goes straight to top_movers.
 
     Returns:
         pd.DataFrame: ['dma', 'start_date', 'end_date', 'start_count', 'end_count', 'weighted_pct_change']
     """
-    df = df.copy()
+    if cube is not None:
+        start = pd.to_datetime(start_date) if start_date else cube['dates'][0]
+        end = pd.to_datetime(end_date) if end_date else cube['dates'][-1]
 
-    start = pd.to_datetime(start_date) if start_date else df['date'].min()
-    end = pd.to_datetime(end_date) if end_date else df['date'].max()
+        start_group = _cube_day_counts(cube, start, action).rename('start_count')
+        end_group = _cube_day_counts(cube, end, action).rename('end_count')
+        combined = pd.concat([start_group, end_group], axis=1)
+        combined = combined[(combined != 0).any(axis=1)]
+    else:
+        df = df.copy()
 
-    if action:
-        df = df[df['action'] == action]
+        start = pd.to_datetime(start_date) if start_date else df['date'].min()
+        end = pd.to_datetime(end_date) if end_date else df['date'].max()
 
-    # Group hitCount by DMA
-    start_group = df[df['date'] == start].groupby('dma')['hitCount'].sum().rename('start_count')
-    end_group = df[df['date'] == end].groupby('dma')['hitCount'].sum().rename('end_count')
+        if action:
+            df = df[df['action'] == action]
 
-    combined = pd.concat([start_group, end_group], axis=1).fillna(0)
+        # Group hitCount by DMA
+        start_group = df[df['date'] == start].groupby('dma')['hitCount'].sum().rename('start_count')
+        end_group = df[df['date'] == end].groupby('dma')['hitCount'].sum().rename('end_count')
+
+        combined = pd.concat([start_group, end_group], axis=1).fillna(0)
     combined['weighted_pct_change'] = (
         (combined['end_count'] - combined['start_count']) / combined['start_count']
     ) * 100 * np.log1p(combined['start_count'])
@@ -40,6 +63,9 @@ def dma_change(df: pd.DataFrame,
     combined['start_date'] = start.strftime('%Y-%m-%d')
     combined['end_date'] = end.strftime('%Y-%m-%d')
 
+    if not sort:
+        return combined
+
     combined['abs_change'] = combined['weighted_pct_change'].abs()
     result = combined.sort_values('abs_change', ascending=False).drop(columns='abs_change').reset_index(drop=True)
 
@@ -54,41 +80,51 @@ def prizm_change(df_peloton: pd.DataFrame,
                  end_date: str = None,
                  action: str = None,
                  start_count: int = None,
-                 end_count: int = None) -> pd.DataFrame:
+                 end_count: int = None,
+                 cube: dict = None,
+                 allocation: dict = None,
+                 sort: bool = True) -> pd.DataFrame:
     """
     Calculates weighted percent change in hitCount per PRIZM segment between two dates.
+    Pass a hit cube from modules.hit_cube instead of `df_peloton` to skip filtering the raw table,
+    a precompiled operator from prizm_allocation.build_allocation to skip rebuilding it,
+    and sort=False when the result goes straight to top_movers.
 
     Returns:
         pd.DataFrame: ['segment', 'start_date', 'end_date', 'start_count', 'end_count', 'weighted_pct_change']
     """
-    pel = df_peloton.copy()
-    prizm = df_prizm.copy()
+    if cube is not None:
+        start = pd.to_datetime(start_date) if start_date else cube['dates'][0]
+        end = pd.to_datetime(end_date) if end_date else cube['dates'][-1]
 
-    # Prepare PRIZM fractions
-    prizm_frac = prizm.set_index('DMA_GCODE').div(100)
+        start_dma = _cube_day_counts(cube, start, action)
+        end_dma = _cube_day_counts(cube, end, action)
+    else:
+        pel = df_peloton.copy()
 
-    # Parse date bounds
-    pel['date'] = pd.to_datetime(pel['date'])
-    start = pd.to_datetime(start_date) if start_date else pel['date'].min()
-    end = pd.to_datetime(end_date) if end_date else pel['date'].max()
+        # Parse date bounds
+        pel['date'] = pd.to_datetime(pel['date'])
+        start = pd.to_datetime(start_date) if start_date else pel['date'].min()
+        end = pd.to_datetime(end_date) if end_date else pel['date'].max()
 
-    if action:
-        pel = pel[pel['action'] == action]
+        if action:
+            pel = pel[pel['action'] == action]
 
-    # Aggregate hitCounts by DMA
-    start_dma = pel[pel['date'] == start].groupby('dma')['hitCount'].sum()
-    end_dma = pel[pel['date'] == end].groupby('dma')['hitCount'].sum()
+        # Aggregate hitCounts by DMA
+        start_dma = pel[pel['date'] == start].groupby('dma')['hitCount'].sum()
+        end_dma = pel[pel['date'] == end].groupby('dma')['hitCount'].sum()
 
     # Join and fill missing DMAs
     dma_counts = pd.concat([start_dma, end_dma], axis=1).fillna(0)
     dma_counts.columns = ['start_count', 'end_count']
 
-    # Allocate to PRIZM segments
-    start_seg = prizm_frac.mul(dma_counts['start_count'], axis=0).sum(axis=0)
-    end_seg = prizm_frac.mul(dma_counts['end_count'], axis=0).sum(axis=0)
+    # Allocate to PRIZM segments: (2 x DMA) @ (DMA x segment)
+    if allocation is None:
+        allocation = build_allocation(df_prizm, dma_counts.index.to_numpy())
+    dma_counts = dma_counts.reindex(allocation['dmas']).fillna(0)
+    seg_counts = allocate(dma_counts.to_numpy().T, allocation).T
 
-    seg_df = pd.concat([start_seg, end_seg], axis=1)
-    seg_df.columns = ['start_count', 'end_count']
+    seg_df = pd.DataFrame(seg_counts, index=allocation['segments'], columns=['start_count', 'end_count'])
 
     seg_df['weighted_pct_change'] = (
         (seg_df['end_count'] - seg_df['start_count']) / seg_df['start_count']
@@ -100,24 +136,229 @@ def prizm_change(df_peloton: pd.DataFrame,
     seg_df['start_date'] = start.strftime('%Y-%m-%d')
     seg_df['end_date'] = end.strftime('%Y-%m-%d')
 
+    if not sort:
+        return seg_df
+
     seg_df['abs_change'] = seg_df['weighted_pct_change'].abs()
     result = seg_df.sort_values('abs_change', ascending=False).drop(columns='abs_change').reset_index(drop=True)
     return result
 
 
-def main():
-    import pandas as pd
+def change_p_value(start_counts, end_counts) -> np.ndarray:
+    """
+    Two-sided p-value that start and end counts come from the same Poisson rate. Conditional on
+    their total n, end ~ Binomial(n, 0.5); uses the normal approximation with continuity correction.
+    """
+    start_counts = np.asarray(start_counts, dtype=float)
+    end_counts = np.asarray(end_counts, dtype=float)
+    total = start_counts + end_counts
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.clip(np.abs(end_counts - total / 2) - 0.5, 0, None) / np.sqrt(total / 4)
+    p_value = erfc(np.nan_to_num(z) / np.sqrt(2))
+    return np.where(total == 0, 1.0, p_value)
+
+
+def _top_k(positions: np.ndarray, score: np.ndarray, k: int) -> np.ndarray:
+    # argpartition finds the k best without sorting the rest; only those k get sorted
+    if len(positions) > k:
+        positions = positions[np.argpartition(-score[positions], k - 1)[:k]]
+    return positions[np.argsort(-score[positions])]
+
+
+def top_movers(result: pd.DataFrame,
+               k: int = 8,
+               max_p_value: float = 0.05) -> dict:
+    """
+    Picks the k largest gainers and k largest losers by weighted_pct_change from a dma_change /
+    prizm_change result, after dropping changes that are not significant at `max_p_value`.
+
+    Returns:
+        dict: 'gainers' and 'losers' DataFrames with an added 'p_value' column
+    """
+    p_value = change_p_value(result['start_count'].to_numpy(), result['end_count'].to_numpy())
+    change = result['weighted_pct_change'].to_numpy(dtype=float)
+    keep = (p_value <= max_p_value) & ~np.isnan(change)
+
+    positions = np.flatnonzero(keep)
+    gainers = _top_k(positions[change[positions] > 0], change, k)
+    losers = _top_k(positions[change[positions] < 0], -change, k)
+
+    with_p = result.assign(p_value=p_value)
+    return {
+        'gainers': with_p.iloc[gainers].reset_index(drop=True),
+        'losers': with_p.iloc[losers].reset_index(drop=True)
+    }
+
+
+def ranked_movers(result: pd.DataFrame,
+                  k: int = 4,
+                  max_p_value: float = 0.05) -> pd.DataFrame:
+    """
+    The k significant gainers plus the k significant losers from top_movers in one table,
+    largest swings first.
+    """
+    top = top_movers(result, k=k, max_p_value=max_p_value)
+    movers = pd.concat([top['gainers'], top['losers']], ignore_index=True)
+    order = movers['weighted_pct_change'].abs().sort_values(ascending=False).index
+    return movers.loc[order].reset_index(drop=True)
+
+
+def sliding_windows(start_date: str,
+                    end_date: str,
+                    step_days: int = 7,
+                    lag_days: int = None) -> list:
+    """
+    Builds (start, end) windows with ends every `step_days` after start_date up to end_date.
+    With `lag_days` each window compares end - lag_days to end; otherwise all windows start at start_date.
+    """
+    start = pd.to_datetime(start_date)
+    ends = pd.date_range(start + pd.Timedelta(days=step_days), pd.to_datetime(end_date), freq=f'{step_days}D')
+    if lag_days:
+        return [(end - pd.Timedelta(days=lag_days), end) for end in ends]
+    return [(start, end) for end in ends]
+
+
+def _daily_dma_matrix(df: pd.DataFrame = None, action: str = None, cube: dict = None):
+    """
+    Returns (dates, dmas, (dates x dmas) hitCount matrix) without copying the input table.
+    """
+    if cube is not None:
+        counts = cube['counts']
+        if action:
+            counts = counts[:, :, cube['actions'] == action]
+        return cube['dates'], cube['dmas'], counts.sum(axis=2)
+
+    mask = (df['action'] == action).to_numpy() if action else np.ones(len(df), dtype=bool)
+    dates = pd.to_datetime(df['date'])
+    all_dates = pd.date_range(dates.min(), dates.max(), freq='D')
+    date_codes = ((dates[mask] - all_dates[0]) // pd.Timedelta(days=1)).to_numpy()
+    dma_codes, dmas = pd.factorize(df['dma'].to_numpy()[mask], sort=True)
+
+    shape = (len(all_dates), len(dmas))
+    flat = np.ravel_multi_index((date_codes, dma_codes), shape)
+    weights = df['hitCount'].to_numpy(dtype=float)[mask]
+    matrix = np.bincount(flat, weights=weights, minlength=shape[0] * shape[1]).reshape(shape)
+    return all_dates, np.asarray(dmas), matrix
+
+
+def _weighted_pct_change(start_counts: np.ndarray, end_counts: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = (end_counts - start_counts) / start_counts * 100 * np.log1p(start_counts)
+    return np.where(start_counts == 0, np.nan, pct)
+
+
+def _windows_frame(windows, labels, label_col, start_counts, end_counts) -> pd.DataFrame:
+    n_windows, n_labels = start_counts.shape
+    return pd.DataFrame({
+        'start_date': np.repeat([pd.Timestamp(s).strftime('%Y-%m-%d') for s, _ in windows], n_labels),
+        'end_date': np.repeat([pd.Timestamp(e).strftime('%Y-%m-%d') for _, e in windows], n_labels),
+        label_col: np.tile(labels, n_windows),
+        'start_count': start_counts.ravel(),
+        'end_count': end_counts.ravel(),
+        'weighted_pct_change': _weighted_pct_change(start_counts, end_counts).ravel()
+    })
+
+
+def mover_windows(windows: list,
+                  df: pd.DataFrame = None,
+                  df_prizm: pd.DataFrame = None,
+                  action: str = None,
+                  cube: dict = None,
+                  allocation: dict = None) -> dict:
+    """
+    Computes DMA (and, when df_prizm or allocation is given, PRIZM segment) weighted percent
+    changes for many (start, end) windows at once from a single (dates x dmas) array.
+
+    Returns:
+        dict: 'dma' -> ['start_date', 'end_date', 'dma', 'start_count', 'end_count', 'weighted_pct_change'],
+              'prizm' -> same with 'segment' (only when df_prizm is given)
+    """
+    dates, dmas, matrix = _daily_dma_matrix(df, action, cube)
+
+    starts = dates.get_indexer(pd.to_datetime([s for s, _ in windows]))
+    ends = dates.get_indexer(pd.to_datetime([e for _, e in windows]))
+    padded = np.vstack([matrix, np.zeros((1, matrix.shape[1]))])  # row -1 = dates outside the data
+    start_counts = padded[starts]
+    end_counts = padded[ends]
+
+    result = {'dma': _windows_frame(windows, dmas, 'dma', start_counts, end_counts)}
+
+    if allocation is None and df_prizm is not None:
+        allocation = build_allocation(df_prizm, dmas)
+    if allocation is not None:
+        allocation = align_allocation(allocation, dmas)
+        result['prizm'] = _windows_frame(windows, allocation['segments'], 'segment',
+                                         allocate(start_counts, allocation), allocate(end_counts, allocation))
+    return result
+
 
-    df_peloton_grouped = pd.read_csv('/Users/lewk20/Desktop/MSBA/Spring/Claritas/created_data/peloton_dma_grouped.csv')
-    df_peloton_grouped['date'] = pd.to_datetime(df_peloton_grouped['date'])
+# Period-over-period modes: window length in days (the prior window is the one right before it)
+PERIOD_MODES = {
+    "Week over Week": 7,
+    "28 Days vs Prior 28": 28
+}
 
-    df_peloton = pd.read_csv('/Users/lewk20/Desktop/MSBA/Spring/Claritas/created_data/peloton_dma.csv')
-    df_peloton['date'] = pd.to_datetime(df_peloton['date'])
 
-    df_prizm = pd.read_excel("/Users/lewk20/Desktop/MSBA/Spring/Claritas/base_data/PRIZM2DMA.xlsx")
-    cols_to_pct = [col for col in df_prizm.columns if col != 'DMA_GCODE']
-    row_sums = df_prizm[cols_to_pct].sum(axis=1)
-    df_prizm[cols_to_pct] = df_prizm[cols_to_pct].div(row_sums, axis=0) * 100
+def _prefix_sums(matrix: np.ndarray) -> np.ndarray:
+    """
+    Cumulative sums over the date axis with a leading zero row, so rows lo..hi-1 sum to P[hi] - P[lo].
+    """
+    return np.vstack([np.zeros((1, matrix.shape[1])), np.cumsum(matrix, axis=0)])
+
+
+def period_change(end_dates: list,
+                  window_days: int = 7,
+                  lag_days: int = None,
+                  df: pd.DataFrame = None,
+                  df_prizm: pd.DataFrame = None,
+                  action: str = None,
+                  cube: dict = None,
+                  allocation: dict = None) -> dict:
+    """
+    Compares the `window_days` total ending on each end date with the same-length window
+    `lag_days` earlier (default: the window right before it), e.g. week-over-week or 28 vs prior 28.
+    Every window total is a difference of two rows of one prefix-sum array, so sweeping many
+    end dates costs the same per DMA as a single one. Days outside the data count as zero.
+
+    Returns:
+        dict: like mover_windows; start_count / end_count are the prior / current window totals,
+              start_date is the first day of the prior window and end_date the last day of the current one
+    """
+    lag_days = lag_days or window_days
+    dates, dmas, matrix = _daily_dma_matrix(df, action, cube)
+    prefix = _prefix_sums(matrix)
+
+    ends = pd.to_datetime(list(end_dates))
+    day = pd.Timedelta(days=1)
+
+    def totals(last_days):
+        hi = dates.searchsorted(last_days, side='right')
+        lo = dates.searchsorted(last_days - (window_days - 1) * day, side='left')
+        return prefix[hi] - prefix[lo]
+
+    end_counts = totals(ends)
+    start_counts = totals(ends - lag_days * day)
+    windows = list(zip(ends - (lag_days + window_days - 1) * day, ends))
+
+    result = {'dma': _windows_frame(windows, dmas, 'dma', start_counts, end_counts)}
+
+    if allocation is None and df_prizm is not None:
+        allocation = build_allocation(df_prizm, dmas)
+    if allocation is not None:
+        allocation = align_allocation(allocation, dmas)
+        result['prizm'] = _windows_frame(windows, allocation['segments'], 'segment',
+                                         allocate(start_counts, allocation), allocate(end_counts, allocation))
+    return result
+
+
+def main():
+    import pandas as pd
+    from modules.data_store import load_prizm, load_table
+
+    df_peloton_grouped = load_table("peloton_dma_grouped")
+    df_peloton = load_table("peloton_dma")
+    df_prizm = load_prizm()
 
 
     # Test DMA Change
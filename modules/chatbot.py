@@ -1,37 +1,25 @@
-import boto3
-import json
-import os
-from dotenv import load_dotenv
+from modules.llm_gateway import DEFAULT_MODEL, invoke, stream
 
-load_dotenv() # add you own credential to the env file
-
-bedrock = boto3.client("bedrock-runtime", region_name="us-west-2")
-
-def chat_with_claude(prompt, context=""):
-    body = {
-        "anthropic_version": "bedrock-2023-05-31",
-        "messages": [
-            {
-                "role": "user",
-                "content": f"Context:\n{context}\n\nQuestion:\n{prompt}"
-            }
-        ],
-        "max_tokens": 2048,
-        "temperature": 0.7,
-        "top_p": 1.0
-    }
+# Start of the reply text returned in place of a reply when the call fails
+CLAUDE_ERROR = "[ERROR] Claude failed"
 
+# Replies are sampled at temperature 0.7, so they are not answered from the reply cache unless the
+# caller asks for it (as the Home summary does for unchanged inputs); every reply is still stored
+def chat_with_claude(prompt, context="", use_cache=False):
     try:
-        response = bedrock.invoke_model(
-            modelId="anthropic.claude-3-5-sonnet-20240620-v1:0",
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps(body)
-        )
-
-        result = json.loads(response["body"].read().decode("utf-8"))
-        return result["content"][0]["text"]
+        return invoke(prompt, context, model=DEFAULT_MODEL, max_tokens=2048, temperature=0.7, top_p=1.0,
+                      use_cache=use_cache)
     except Exception as e:
-        return f"[ERROR] Claude failed: {e}"
+        return f"{CLAUDE_ERROR}: {e}"
 
 
+def stream_chat_with_claude(prompt, context="", use_cache=False):
+    """
+    Generator version of chat_with_claude for st.write_stream: yields the reply as it is
+    generated, ending with an error note if the call fails part-way.
+    """
+    try:
+        yield from stream(prompt, context, model=DEFAULT_MODEL, max_tokens=2048, temperature=0.7, top_p=1.0,
+                          use_cache=use_cache)
+    except Exception as e:
+        yield f"{CLAUDE_ERROR}: {e}"
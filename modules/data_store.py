@@ -0,0 +1,235 @@
+"""
+Columnar copies of the dashboard's CSV sources. Each CSV is converted once into typed Parquet
+(string dimensions as categoricals, integer counts as int32, hit tables partitioned by year) and
+reconverted automatically whenever the CSV is newer than its Parquet copy. Every conversion
+writes a new version directory and then atomically swaps a small pointer file to it, so readers
+never see a half-written or missing dataset and concurrent conversions don't collide.
+
+Convert everything up front from the folder that contains PelotonDashboard/:
+    PYTHONPATH=PelotonDashboard python -m modules.data_store
+
+PRIZM2DMA.xlsx is handled separately by load_prizm(): it is normalized to row percentages once
+and cached as Parquet, keyed by the workbook's SHA-256 so edits to the sheet are picked up.
+"""
+import hashlib
+import os
+import shutil
+import time
+
+import pandas as pd
+
+DATA_DIR = "PelotonDashboard/data"
+PARQUET_DIR_NAME = "parquet"
+PRIZM_WORKBOOK = "PRIZM2DMA.xlsx"
+
+# Versions older than the one just replaced are deleted once they are this old, which leaves
+# time for readers still on them and for conversions that started earlier to finish
+VERSION_GRACE_SECONDS = 10 * 60
+
+# name -> csv file, date column (None when the table has no dates) and string columns to store as categoricals
+SOURCES = {
+    "peloton": {
+        "file": "new_peloton_data_with_region.csv",
+        "date_col": "date",
+        "categorical": ["action", "dma_region"]
+    },
+    "competitor": {
+        "file": "new_competitor_data_with_region.csv",
+        "date_col": "date",
+        "categorical": ["action", "dma_region"]
+    },
+    "peloton_dma": {
+        "file": "peloton_dma.csv",
+        "date_col": "date",
+        "categorical": ["action"]
+    },
+    "peloton_dma_grouped": {
+        "file": "peloton_dma_grouped.csv",
+        "date_col": "date",
+        "categorical": ["action"]
+    },
+    "dma_demo_region": {
+        "file": "dma_demo_region.csv",
+        "date_col": None,
+        "categorical": ["dma_region"]
+    }
+}
+
+
+def _csv_path(name, data_dir):
+    return os.path.join(data_dir, SOURCES[name]["file"])
+
+
+def _pointer_path(name, data_dir):
+    return os.path.join(data_dir, PARQUET_DIR_NAME, f"{name}.current")
+
+
+def _parquet_path(name, data_dir):
+    """
+    Returns:
+        str or None: the current version directory, or None if the source was never converted
+    """
+    try:
+        with open(_pointer_path(name, data_dir)) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(data_dir, PARQUET_DIR_NAME, version)
+
+
+def _version_time(version):
+    # "<name>.v<time_ns>.<pid>" -> time_ns
+    return int(version.rsplit(".", 2)[1][1:])
+
+
+def _is_stale(name, data_dir):
+    parquet_path = _parquet_path(name, data_dir)
+    if parquet_path is None or not os.path.isdir(parquet_path):
+        return True
+    csv_path = _csv_path(name, data_dir)
+    return os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(_pointer_path(name, data_dir))
+
+
+def _remove_old_versions(name, parquet_dir, previous):
+    """
+    Deletes the versions older than `previous` (the one just replaced) that are past the grace
+    period, and the unversioned directory of the old layout.
+    """
+    shutil.rmtree(os.path.join(parquet_dir, name), ignore_errors=True)
+    if previous is None:
+        return
+    cutoff = min(_version_time(os.path.basename(previous)), time.time_ns() - VERSION_GRACE_SECONDS * 10 ** 9)
+    for entry in os.listdir(parquet_dir):
+        if entry.startswith(f"{name}.v") and _version_time(entry) < cutoff:
+            shutil.rmtree(os.path.join(parquet_dir, entry), ignore_errors=True)
+
+
+def convert_source(name, data_dir=DATA_DIR):
+    """
+    Reads one CSV, applies compact dtypes and writes it as Parquet (partitioned by year if dated).
+    """
+    source = SOURCES[name]
+    date_col = source["date_col"]
+    df = pd.read_csv(_csv_path(name, data_dir), parse_dates=[date_col] if date_col else None)
+
+    for col in source["categorical"]:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    # int32 halves the hit counts without risking overflow when they are summed
+    for col in df.select_dtypes(include="int64").columns:
+        if df[col].abs().max() < 2 ** 31:
+            df[col] = df[col].astype("int32")
+
+    parquet_dir = os.path.join(data_dir, PARQUET_DIR_NAME)
+    version = f"{name}.v{time.time_ns()}.{os.getpid()}"
+    parquet_path = os.path.join(parquet_dir, version)
+    if date_col:
+        df["year"] = df[date_col].dt.year
+        df.to_parquet(parquet_path, index=False, partition_cols=["year"])
+    else:
+        os.makedirs(parquet_path)
+        df.to_parquet(os.path.join(parquet_path, "part-0.parquet"), index=False)
+
+    previous = _parquet_path(name, data_dir)
+    pointer_path = _pointer_path(name, data_dir)
+    tmp_pointer = f"{pointer_path}.{version}.tmp"
+    with open(tmp_pointer, "w") as f:
+        f.write(version)
+    os.replace(tmp_pointer, pointer_path)
+
+    _remove_old_versions(name, parquet_dir, previous)
+    return parquet_path
+
+
+def load_table(name, columns=None, start=None, end=None, data_dir=DATA_DIR):
+    """
+    Loads a source from its Parquet copy, converting it first if needed.
+
+    Args:
+        columns (list): only read these columns
+        start, end: inclusive date bounds; only the matching year partitions are read
+
+    Returns:
+        pd.DataFrame
+    """
+    if _is_stale(name, data_dir):
+        convert_source(name, data_dir)
+
+    date_col = SOURCES[name]["date_col"]
+    filters = []
+    if date_col and start is not None:
+        start = pd.Timestamp(start)
+        filters += [("year", ">=", start.year), (date_col, ">=", start)]
+    if date_col and end is not None:
+        end = pd.Timestamp(end)
+        filters += [("year", "<=", end.year), (date_col, "<=", end)]
+
+    df = pd.read_parquet(_parquet_path(name, data_dir), columns=columns, filters=filters or None)
+    if "year" in df.columns and (columns is None or "year" not in columns):
+        df = df.drop(columns="year")
+    return df
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def convert_prizm(data_dir=DATA_DIR):
+    """
+    Parses PRIZM2DMA.xlsx, rescales every DMA row to percentages that sum to 100 and caches it
+    as Parquet next to a checksum of the workbook it came from.
+    """
+    workbook = os.path.join(data_dir, PRIZM_WORKBOOK)
+    df_prizm = pd.read_excel(workbook)
+    cols_to_pct = [col for col in df_prizm.columns if col != 'DMA_GCODE']
+    row_sums = df_prizm[cols_to_pct].sum(axis=1)
+    df_prizm[cols_to_pct] = df_prizm[cols_to_pct].div(row_sums, axis=0) * 100
+
+    parquet_dir = os.path.join(data_dir, PARQUET_DIR_NAME)
+    os.makedirs(parquet_dir, exist_ok=True)
+    tmp_path = os.path.join(parquet_dir, f"prizm2dma.{os.getpid()}.tmp")
+    df_prizm.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, os.path.join(parquet_dir, "prizm2dma.parquet"))
+    with open(os.path.join(parquet_dir, "prizm2dma.sha256"), "w") as f:
+        f.write(_file_sha256(workbook))
+    return df_prizm
+
+
+def load_prizm(data_dir=DATA_DIR):
+    """
+    Returns PRIZM2DMA with each DMA row normalized to percentages, reading Excel only when the
+    workbook's checksum differs from the one the cached copy was built from.
+
+    Returns:
+        pd.DataFrame: ['DMA_GCODE', <68 segment columns>]
+    """
+    parquet_dir = os.path.join(data_dir, PARQUET_DIR_NAME)
+    parquet_path = os.path.join(parquet_dir, "prizm2dma.parquet")
+    checksum_path = os.path.join(parquet_dir, "prizm2dma.sha256")
+    workbook = os.path.join(data_dir, PRIZM_WORKBOOK)
+
+    if os.path.exists(parquet_path) and os.path.exists(checksum_path):
+        with open(checksum_path) as f:
+            cached_checksum = f.read().strip()
+        if not os.path.exists(workbook) or cached_checksum == _file_sha256(workbook):
+            return pd.read_parquet(parquet_path)
+
+    return convert_prizm(data_dir)
+
+
+def main():
+    for name in SOURCES:
+        if os.path.exists(_csv_path(name, DATA_DIR)):
+            print(f"Converted {name} -> {convert_source(name)}")
+        else:
+            print(f"[WARN] Missing {_csv_path(name, DATA_DIR)}")
+    convert_prizm()
+    print(f"Converted PRIZM2DMA -> {os.path.join(DATA_DIR, PARQUET_DIR_NAME, 'prizm2dma.parquet')}")
+
+
+if __name__ == "__main__":
+    main()
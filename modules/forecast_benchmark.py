@@ -0,0 +1,138 @@
+"""
+Rolling-origin backtest of the forecast engines over the Peloton and competitor hit data.
+Reports accuracy (MAPE / sMAPE) and fit and predict time per series and engine, and writes
+everything to a JSON report so runs can be compared over time.
+
+With --memory it also reports peak traced memory. Tracing slows allocation-heavy engines by
+different amounts, so memory is measured in a separate traced run of the last origin only.
+
+Run from the folder that contains PelotonDashboard/:
+    PYTHONPATH=PelotonDashboard python -m modules.forecast_benchmark --origins 4 --engines holt_winters auto_arima
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from modules.forecast_engines import ENGINES, run_engine
+from modules.forecasting import FORECAST_HORIZON, build_daily_series, fit_auto_arima
+from modules.precompute_forecasts import ALL, DATA_DIR, DATASETS, load_dataset
+
+REPORT_PATH = "PelotonDashboard/cache/benchmarks/forecast_benchmark.json"
+
+# Origins with less history than two weekly seasons are skipped
+MIN_HISTORY_DAYS = 14
+
+
+def mape(actual, forecast):
+    actual, forecast = np.asarray(actual, dtype=float), np.asarray(forecast, dtype=float)
+    nonzero = actual != 0
+    if not nonzero.any():
+        return float("nan")
+    return float(np.mean(np.abs((actual[nonzero] - forecast[nonzero]) / actual[nonzero])) * 100)
+
+
+def smape(actual, forecast):
+    actual, forecast = np.asarray(actual, dtype=float), np.asarray(forecast, dtype=float)
+    denom = np.abs(actual) + np.abs(forecast)
+    ratio = np.divide(2 * np.abs(forecast - actual), denom, out=np.zeros_like(denom), where=denom != 0)
+    return float(np.mean(ratio) * 100)
+
+
+def _run_once(engine, history, horizon):
+    """
+    Returns (forecast, fit seconds, predict seconds). The vectorized engines fit and predict
+    in a single pass, so their whole run is reported as fit time.
+    """
+    if engine == "auto_arima":
+        start = time.perf_counter()
+        model = fit_auto_arima(np.log1p(history))
+        fitted = time.perf_counter()
+        forecast = np.expm1(np.asarray(model.predict(n_periods=horizon)))
+        return forecast, fitted - start, time.perf_counter() - fitted
+
+    start = time.perf_counter()
+    forecast = run_engine(engine, history, horizon)["forecast"][0]
+    return forecast, time.perf_counter() - start, 0.0
+
+
+def backtest_series(series, engine, origins=4, step=7, horizon=FORECAST_HORIZON, memory=False):
+    """
+    Refits at `origins` cut-off dates spaced `step` days apart, each scored on the next `horizon` days.
+    With `memory`, the last origin is run once more under tracemalloc for peak memory.
+    """
+    values = series.values.astype(float)
+    cutoffs = [len(values) - horizon - i * step for i in range(origins)]
+    cutoffs = [c for c in cutoffs if c >= MIN_HISTORY_DAYS]
+
+    scores = {"mape": [], "smape": [], "fit_seconds": [], "predict_seconds": []}
+    for cutoff in reversed(cutoffs):
+        forecast, fit_seconds, predict_seconds = _run_once(engine, values[:cutoff], horizon)
+
+        actual = values[cutoff:cutoff + horizon]
+        scores["mape"].append(mape(actual, forecast))
+        scores["smape"].append(smape(actual, forecast))
+        scores["fit_seconds"].append(fit_seconds)
+        scores["predict_seconds"].append(predict_seconds)
+
+    result = {name: float(np.nanmean(vals)) if vals else None for name, vals in scores.items()}
+    result["origins"] = len(cutoffs)
+    result["peak_memory_mb"] = None
+    if memory and cutoffs:
+        tracemalloc.start()
+        _run_once(engine, values[:cutoffs[0]], horizon)
+        result["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    return result
+
+
+def run_benchmark(engines=None, origins=4, step=7, horizon=FORECAST_HORIZON, per_action=False, data_dir=DATA_DIR,
+                  memory=False):
+    engines = engines or list(ENGINES)
+    results = []
+    for dataset, count_col in DATASETS.items():
+        df = load_dataset(dataset, data_dir)
+        actions = [ALL] + (sorted(df['action'].dropna().unique().tolist()) if per_action else [])
+        for action in actions:
+            series = build_daily_series(df, action, None, count_col=count_col)
+            for engine in engines:
+                row = {"dataset": dataset, "action": action, "engine": engine, "days": len(series)}
+                row.update(backtest_series(series, engine, origins, step, horizon, memory))
+                results.append(row)
+                if row["origins"]:
+                    print(f"{dataset:<10} {action:<10} {engine:<15} sMAPE={row['smape']:.2f} fit={row['fit_seconds']:.3f}s")
+
+    return {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {"engines": engines, "origins": origins, "step": step, "horizon": horizon, "memory": memory},
+        "results": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest and time the forecast engines.")
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES), default=None)
+    parser.add_argument("--origins", type=int, default=4)
+    parser.add_argument("--step", type=int, default=7)
+    parser.add_argument("--horizon", type=int, default=FORECAST_HORIZON)
+    parser.add_argument("--per-action", action="store_true")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--output", default=REPORT_PATH)
+    parser.add_argument("--memory", action="store_true", help="also measure peak memory on the last origin")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.engines, args.origins, args.step, args.horizon, args.per_action, args.data_dir,
+                           args.memory)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
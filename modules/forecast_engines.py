@@ -0,0 +1,110 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from modules.forecasting import ARIMA_PARAMS, FORECAST_HORIZON, fit_auto_arima
+
+SEASON = ARIMA_PARAMS["m"]
+
+
+def seasonal_naive(Y_log, horizon, m=SEASON):
+    """
+    Repeats the last week of every series. Works on a (series x days) array in one shot.
+    Series shorter than a week have no full season to repeat and get their last value instead.
+
+    Returns:
+        tuple: (mean, standard error), each (series x horizon) in log space
+    """
+    n_series, n_days = Y_log.shape
+    steps = np.arange(1, horizon + 1)
+    if n_days < m:
+        mean = np.repeat(Y_log[:, -1:], horizon, axis=1)
+        diffs = np.diff(Y_log, axis=1)
+        sigma = diffs.std(axis=1, keepdims=True) if diffs.shape[1] > 1 else np.zeros((n_series, 1))
+        return mean, sigma * np.sqrt(steps)
+
+    reps = int(np.ceil(horizon / m))
+    mean = np.tile(Y_log[:, -m:], reps)[:, :horizon]
+
+    seasonal_diff = Y_log[:, m:] - Y_log[:, :-m]
+    sigma = seasonal_diff.std(axis=1, keepdims=True) if seasonal_diff.shape[1] > 1 else np.zeros((len(Y_log), 1))
+    seasons_ahead = np.arange(horizon) // m + 1
+    return mean, sigma * np.sqrt(seasons_ahead)
+
+
+def holt_winters(Y_log, horizon, m=SEASON, alpha=0.3, beta=0.05, gamma=0.2):
+    """
+    Additive Holt-Winters with weekly seasonality, stepped through time once for all series together.
+
+    Returns:
+        tuple: (mean, standard error), each (series x horizon) in log space
+    """
+    n_series, n_days = Y_log.shape
+    if n_days < 2 * m:
+        return seasonal_naive(Y_log, horizon, m)
+
+    level = Y_log[:, :m].mean(axis=1)
+    trend = (Y_log[:, m:2 * m].mean(axis=1) - level) / m
+    season = Y_log[:, :m] - level[:, None]
+
+    sq_err = np.zeros(n_series)
+    for t in range(n_days):
+        y = Y_log[:, t]
+        s = season[:, t % m]
+        sq_err += (y - (level + trend + s)) ** 2
+
+        new_level = alpha * (y - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[:, t % m] = gamma * (y - new_level) + (1 - gamma) * s
+        level = new_level
+
+    steps = np.arange(1, horizon + 1)
+    mean = level[:, None] + steps * trend[:, None] + season[:, (n_days + steps - 1) % m]
+    sigma = np.sqrt(sq_err / n_days)[:, None]
+    return mean, sigma * np.sqrt(steps)
+
+
+def auto_arima_engine(Y_log, horizon, alpha=0.05):
+    """
+    The dashboard's original model, fitted series by series.
+
+    Returns:
+        tuple: (mean, standard error), each (series x horizon) in log space
+    """
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+    means, errors = [], []
+    for row in Y_log:
+        model = fit_auto_arima(row)
+        mean, conf_int = model.predict(n_periods=horizon, return_conf_int=True, alpha=alpha)
+        conf_int = np.asarray(conf_int)
+        means.append(np.asarray(mean))
+        errors.append((conf_int[:, 1] - conf_int[:, 0]) / (2 * z))
+    return np.vstack(means), np.vstack(errors)
+
+
+ENGINES = {
+    "auto_arima": auto_arima_engine,
+    "holt_winters": holt_winters,
+    "seasonal_naive": seasonal_naive
+}
+
+
+def run_engine(engine, Y, horizon=FORECAST_HORIZON, alpha=0.05):
+    """
+    Forecasts every row of a (series x days) hit count array with the named engine.
+
+    Returns:
+        dict: 'forecast', 'lower', 'upper' arrays of shape (series x horizon), in hit counts
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown forecast engine '{engine}'. Choose from {sorted(ENGINES)}.")
+
+    Y_log = np.log1p(np.atleast_2d(np.asarray(Y, dtype=float)))
+    mean, std_err = ENGINES[engine](Y_log, horizon)
+
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+    return {
+        "forecast": np.expm1(mean),
+        "lower": np.expm1(mean - z * std_err),
+        "upper": np.expm1(mean + z * std_err)
+    }
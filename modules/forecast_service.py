@@ -0,0 +1,63 @@
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modules.forecast_engines import run_engine
+from modules.forecasting import FORECAST_HORIZON, forecast_from_model
+from modules.model_store import get_or_update_model
+
+# One pool per server process; Streamlit keeps imported modules alive across reruns
+_executor = None
+
+
+def get_executor(max_workers=None):
+    global _executor
+    if _executor is None:
+        # spawn avoids forking the Streamlit server's threads into the workers
+        _executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        atexit.register(_executor.shutdown, wait=False, cancel_futures=True)
+    return _executor
+
+
+def forecast_series(series, dataset, action, dmas, horizon=FORECAST_HORIZON, engine="auto_arima"):
+    """
+    Forecasts `horizon` days of one daily series. Auto ARIMA goes through the model store;
+    the other engines in `forecast_engines.ENGINES` are cheap enough to run directly.
+
+    Returns:
+        tuple: (forecast values, forecast DatetimeIndex)
+    """
+    if engine == "auto_arima":
+        model = get_or_update_model(np.log1p(series), dataset, action, dmas)
+        return forecast_from_model(model, series, horizon)
+
+    forecast = run_engine(engine, series.values, horizon)["forecast"][0]
+    forecast_index = pd.date_range(
+        start=series.index[-1] + pd.Timedelta(days=1),
+        periods=horizon,
+        freq='D'
+    )
+    return forecast, forecast_index
+
+
+def submit_forecasts(jobs, horizon=FORECAST_HORIZON, engine="auto_arima"):
+    """
+    Submits every series to the process pool without waiting for any of them.
+
+    Args:
+        jobs (dict): name -> (series, dataset, action, dmas)
+
+    Returns:
+        dict: name -> Future resolving to the `forecast_series` tuple
+    """
+    executor = get_executor()
+    return {
+        name: executor.submit(forecast_series, series, dataset, action, dmas, horizon, engine)
+        for name, (series, dataset, action, dmas) in jobs.items()
+    }
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+from pmdarima import auto_arima
+
+# Order search settings shared by every Auto ARIMA fit on the dashboard
+ARIMA_PARAMS = {
+    "seasonal": True,
+    "m": 7,
+    "d": 1,
+    "D": 1,
+    "stepwise": True
+}
+
+FORECAST_HORIZON = 30
+
+
+def build_daily_series(df, action=None, dmas=None, count_col="hitCount"):
+    """
+    Filters the hit table by action / DMA region and sums it into a gap-free daily series.
+    """
+    filtered = df
+    if action and action != 'All':
+        filtered = filtered[filtered['action'] == action]
+    if dmas:
+        filtered = filtered[filtered['dma_region'].isin(dmas)]
+
+    daily = filtered.groupby('date')[count_col].sum()
+    daily.index = pd.to_datetime(daily.index)
+    return daily.asfreq('D', fill_value=0)
+
+
+def fit_auto_arima(series_log):
+    return auto_arima(
+        series_log,
+        trace=False,
+        error_action='ignore',
+        suppress_warnings=True,
+        **ARIMA_PARAMS
+    )
+
+
+def forecast_from_model(model, series, horizon=FORECAST_HORIZON):
+    """
+    Predicts `horizon` days past the end of `series` and undoes the log1p transform.
+
+    Returns:
+        tuple: (forecast values, forecast DatetimeIndex)
+    """
+    forecast_log = model.predict(n_periods=horizon)
+    forecast = np.expm1(np.asarray(forecast_log))
+    forecast_index = pd.date_range(
+        start=series.index[-1] + pd.Timedelta(days=1),
+        periods=horizon,
+        freq='D'
+    )
+    return forecast, forecast_index
+
+
+def forecast_with_intervals(model, series, horizon=FORECAST_HORIZON, alpha=0.05):
+    """
+    Predicts `horizon` days with a (1 - alpha) confidence band, back-transformed from log1p.
+
+    Returns:
+        pd.DataFrame: ['date', 'forecast', 'lower', 'upper']
+    """
+    forecast_log, conf_int = model.predict(n_periods=horizon, return_conf_int=True, alpha=alpha)
+    conf_int = np.asarray(conf_int)
+    forecast_index = pd.date_range(
+        start=series.index[-1] + pd.Timedelta(days=1),
+        periods=horizon,
+        freq='D'
+    )
+    return pd.DataFrame({
+        "date": forecast_index,
+        "forecast": np.expm1(np.asarray(forecast_log)),
+        "lower": np.expm1(conf_int[:, 0]),
+        "upper": np.expm1(conf_int[:, 1])
+    })
+
+
+def residual_scale(model, skip=None):
+    """
+    Standard deviation of in-sample residuals, skipping the differencing warm-up at the start.
+    """
+    resid = np.asarray(model.resid())
+    if skip is None:
+        skip = ARIMA_PARAMS["d"] + ARIMA_PARAMS["D"] * ARIMA_PARAMS["m"]
+    resid = resid[skip:] if len(resid) > skip + 1 else resid
+    return float(np.std(resid))
+
+
+def update_arima(model, new_obs):
+    """
+    Warm-starts an already fitted model with new observations, keeping its (p,d,q)(P,D,Q,m) order.
+
+    Returns:
+        tuple: (updated model, RMSE of the pre-update forecast over the new observations)
+    """
+    new_obs = np.asarray(new_obs, dtype=float)
+    predicted = np.asarray(model.predict(n_periods=len(new_obs)))
+    forecast_rmse = float(np.sqrt(np.mean((predicted - new_obs) ** 2)))
+    model.update(new_obs)
+    return model, forecast_rmse
@@ -1,7 +1,9 @@
-import requests
 import os
 from dotenv import load_dotenv
 
+from modules.http_client import get_json
+from modules.search_cache import cached_search
+
 load_dotenv()
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -16,7 +18,22 @@ RECENCY_MAP = {
     "365d": "qdr:y"    # last year
 }
 
-def google_search_snippets(query, num_results=5, recency=None):
+def google_search_snippets(query, num_results=5, recency=None, source="Google", use_cache=True, start=1):
+    """
+    Queries the Custom Search API through the shared HTTP client, which pools connections,
+    retries throttled calls and counts them against the daily quota. Raises
+    http_client.HttpClientError when the API errors out or returns something that is not JSON.
+    Results are served from the on-disk search cache while fresh; `source` is part of the
+    cache key and use_cache=False forces a new query. `start` is the 1-based rank of the first
+    result, for paging past the API's 10-results-per-call limit.
+    """
+    return cached_search(
+        lambda: _fetch_snippets(query, num_results, recency, start),
+        query, num_results, recency, source, start=start, use_cache=use_cache
+    )
+
+
+def _fetch_snippets(query, num_results, recency, start=1):
     url = "https://www.googleapis.com/customsearch/v1"
     params = {
         "key": GOOGLE_API_KEY,
@@ -24,12 +41,13 @@ def google_search_snippets(query, num_results=5, recency=None):
         "q": query,
         "num": num_results
     }
+    if start != 1:
+        params["start"] = start
 
     if recency in RECENCY_MAP:
         params["tbs"] = RECENCY_MAP[recency]
 
-    response = requests.get(url, params=params)
-    data = response.json()
+    data = get_json(url, params=params, api="google_cse")
 
     results = []
     for item in data.get("items", []):
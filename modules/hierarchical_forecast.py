@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+from modules.forecast_engines import run_engine
+from modules.forecasting import FORECAST_HORIZON
+
+RECONCILIATION_METHODS = ["bottom_up", "ols", "wls_struct"]
+
+
+def build_leaf_matrix(df, count_col="hitCount", leaf_col=None):
+    """
+    Pivots the hit table into one gap-free daily row per (action, DMA) leaf.
+
+    Returns:
+        tuple: (leaves DataFrame ['action', leaf_col, 'dma_region'], (leaves x days) array, DatetimeIndex)
+    """
+    if leaf_col is None:
+        leaf_col = 'dma' if 'dma' in df.columns else 'dma_region'
+
+    pivot = df.pivot_table(index=['action', leaf_col], columns='date', values=count_col,
+                           aggfunc='sum', fill_value=0, observed=True)
+    pivot.columns = pd.to_datetime(pivot.columns)
+    dates = pd.date_range(pivot.columns.min(), pivot.columns.max(), freq='D')
+    pivot = pivot.reindex(columns=dates, fill_value=0)
+
+    leaves = pivot.index.to_frame(index=False)
+    if leaf_col == 'dma_region':
+        leaves['dma_region'] = leaves[leaf_col]
+    else:
+        leaves['dma_region'] = leaves[leaf_col].map(df.groupby(leaf_col, observed=True)['dma_region'].first())
+    return leaves, pivot.values.astype(float), dates
+
+
+def summing_matrix(leaves, leaf_col):
+    """
+    Stacks total, per-action, per-region, per action x region and leaf rows into S,
+    so that every node series is S @ leaf series.
+
+    Returns:
+        tuple: (S as (nodes x leaves) array, list of (action, region) labels for the aggregate rows)
+    """
+    rows = [np.ones(len(leaves))]
+    labels = [("All", "All")]
+
+    actions = sorted(leaves['action'].unique())
+    regions = sorted(leaves['dma_region'].dropna().unique())
+    for action in actions:
+        rows.append((leaves['action'] == action).values)
+        labels.append((action, "All"))
+    for region in regions:
+        rows.append((leaves['dma_region'] == region).values)
+        labels.append(("All", region))
+    if leaf_col != 'dma_region':
+        for action in actions:
+            for region in regions:
+                rows.append(((leaves['action'] == action) & (leaves['dma_region'] == region)).values)
+                labels.append((action, region))
+
+    S = np.vstack([np.asarray(rows, dtype=float), np.eye(len(leaves))])
+    return S, labels
+
+
+def reconcile(base, S, method="wls_struct"):
+    """
+    Maps base forecasts for every node onto coherent leaf forecasts.
+
+    bottom_up keeps the leaf forecasts as is; ols and wls_struct are the MinT projection
+    with identity and structural-scaling (leaves below each node) covariance respectively.
+    The projection can push sparse leaves below zero, so reconciled leaves are clipped at 0.
+    """
+    n_leaves = S.shape[1]
+    if method == "bottom_up":
+        return base[-n_leaves:]
+    if method == "ols":
+        weights = np.ones(S.shape[0])
+    elif method == "wls_struct":
+        weights = 1.0 / S.sum(axis=1)
+    else:
+        raise ValueError(f"Unknown reconciliation method '{method}'. Choose from {RECONCILIATION_METHODS}.")
+
+    StW = S.T * weights
+    return np.clip(np.linalg.solve(StW @ S, StW @ base), 0, None)
+
+
+def build_hierarchical_forecast(df, count_col="hitCount", leaf_col=None, engine="holt_winters",
+                                method="wls_struct", horizon=FORECAST_HORIZON):
+    """
+    Forecasts every (action, DMA) leaf and every action / region rollup in one batch and
+    reconciles them so any filter selection is just a sum of leaf rows.
+
+    Returns:
+        dict: 'leaves' DataFrame, 'forecast' (leaves x horizon) array, 'index' forecast DatetimeIndex
+    """
+    if leaf_col is None:
+        leaf_col = 'dma' if 'dma' in df.columns else 'dma_region'
+
+    leaves, Y, dates = build_leaf_matrix(df, count_col, leaf_col)
+    S, _ = summing_matrix(leaves, leaf_col)
+
+    base = run_engine(engine, S @ Y, horizon)["forecast"]
+    return {
+        "leaves": leaves,
+        "forecast": reconcile(base, S, method),
+        "index": pd.date_range(start=dates[-1] + pd.Timedelta(days=1), periods=horizon, freq='D')
+    }
+
+
+def select_forecast(hierarchy, action=None, regions=None):
+    """
+    Answers a filter selection by summing the matching reconciled leaf forecasts.
+    """
+    leaves = hierarchy["leaves"]
+    mask = np.ones(len(leaves), dtype=bool)
+    if action and action != 'All':
+        mask &= (leaves['action'] == action).values
+    if regions:
+        mask &= leaves['dma_region'].isin(regions).values
+    return hierarchy["forecast"][mask].sum(axis=0)
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+from modules.data_store import load_table
+
+
+def _region_lookup():
+    demo = load_table("dma_demo_region", columns=["dma_code", "dma_region"])
+    return pd.Series(demo["dma_region"].astype(str).str.strip().values, index=demo["dma_code"].values)
+
+
+def build_cube(df, count_col="hitCount", dma_col=None):
+    """
+    Materializes hit counts as a dense (date x dma x action) array with integer-coded dimensions.
+    dma_region is kept as a dimension attribute of each DMA, taken from the table itself or,
+    when the table has no dma_region column, from dma_demo_region.csv.
+
+    Returns:
+        dict: 'dates', 'dmas', 'actions', 'dma_region' dimension arrays and the 'counts' array
+    """
+    if dma_col is None:
+        dma_col = 'dma' if 'dma' in df.columns else 'dma_region'
+
+    dates = pd.to_datetime(df['date'])
+    all_dates = pd.date_range(dates.min(), dates.max(), freq='D')
+    date_codes = ((dates - all_dates[0]) // pd.Timedelta(days=1)).to_numpy()
+    dma_codes, dmas = pd.factorize(df[dma_col], sort=True)
+    action_codes, actions = pd.factorize(df['action'], sort=True)
+
+    shape = (len(all_dates), len(dmas), len(actions))
+    flat = np.ravel_multi_index((date_codes, dma_codes, action_codes), shape)
+    counts = np.bincount(flat, weights=df[count_col].to_numpy(dtype=float), minlength=np.prod(shape))
+
+    dmas = np.asarray(dmas)
+    if dma_col == 'dma_region':
+        regions = dmas.astype(str)
+    elif 'dma_region' in df.columns:
+        regions = df.groupby(dma_col, observed=True)['dma_region'].first().reindex(dmas).astype(str).values
+    else:
+        regions = _region_lookup().reindex(dmas).fillna("Unknown").values
+
+    return {
+        "dates": all_dates,
+        "dmas": dmas,
+        "actions": np.asarray(actions).astype(str),
+        "dma_region": np.asarray(regions),
+        "counts": counts.reshape(shape)
+    }
+
+
+def _date_slice(cube, start, end):
+    dates = cube["dates"]
+    lo = 0 if start is None else dates.searchsorted(pd.Timestamp(start), side='left')
+    hi = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end), side='right')
+    return slice(lo, hi)
+
+
+def _dimension_mask(values, selected):
+    if selected is None or (isinstance(selected, str) and selected == 'All'):
+        return None
+    if isinstance(selected, str):
+        selected = [selected]
+    if len(selected) == 0:
+        return None
+    return np.isin(values, list(selected))
+
+
+def query_cube(cube, start=None, end=None, actions=None, dmas=None, regions=None, by=None):
+    """
+    Sums hit counts for a filter selection with array slicing only.
+
+    Args:
+        start, end: inclusive date bounds
+        actions, dmas, regions: a value or list of values to keep ('All' / None keeps everything)
+        by: None for a grand total, or 'date', 'dma' or 'action' to keep that dimension
+
+    Returns:
+        float, or pd.Series indexed by the `by` dimension
+    """
+    block = cube["counts"][_date_slice(cube, start, end)]
+
+    action_mask = _dimension_mask(cube["actions"], actions)
+    if action_mask is not None:
+        block = block[:, :, action_mask]
+
+    dma_mask = _dimension_mask(cube["dmas"], dmas)
+    region_mask = _dimension_mask(cube["dma_region"], regions)
+    if region_mask is not None:
+        dma_mask = region_mask if dma_mask is None else dma_mask & region_mask
+
+    if by == 'dma':
+        totals = block.sum(axis=(0, 2))
+        if dma_mask is not None:
+            totals = np.where(dma_mask, totals, 0.0)
+        return pd.Series(totals, index=cube["dmas"])
+
+    if dma_mask is not None:
+        block = block[:, dma_mask, :]
+
+    if by == 'date':
+        dates = cube["dates"][_date_slice(cube, start, end)]
+        return pd.Series(block.sum(axis=(1, 2)), index=dates)
+    if by == 'action':
+        actions = cube["actions"] if action_mask is None else cube["actions"][action_mask]
+        return pd.Series(block.sum(axis=(0, 1)), index=actions)
+    if by is None:
+        return float(block.sum())
+    raise ValueError(f"Unknown dimension '{by}'. Use None, 'date', 'dma' or 'action'.")
+
+
+def cube_daily_series(cube, action=None, regions=None):
+    """
+    Equivalent of forecasting.build_daily_series read from the cube: the daily total for the
+    selection, trimmed to the days between its first and last hit.
+    """
+    series = query_cube(cube, actions=action, regions=regions, by='date')
+    nonzero = np.flatnonzero(series.values)
+    if len(nonzero) == 0:
+        return series.iloc[0:0]
+    return series.iloc[nonzero[0]:nonzero[-1] + 1].asfreq('D')
@@ -0,0 +1,133 @@
+"""
+Shared HTTP client for the external search APIs: one keep-alive Session per process with a
+connection pool, timeouts on every call, exponential backoff on 429 / 5xx and a per-API daily
+request counter so a quota is stopped locally instead of by an error page from the API.
+"""
+import os
+import re
+import threading
+from datetime import date
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Retries on throttling and server errors; waits 0.5s, 1s, 2s ... and honours Retry-After
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Connections kept open per host; matches the search fan-out so no request waits for a socket
+POOL_SIZE = 8
+
+# api name -> requests allowed per day (None = unlimited). The Custom Search free tier is 100/day.
+DAILY_QUOTAS = {
+    "google_cse": int(os.getenv("GOOGLE_CSE_DAILY_QUOTA", "100"))
+}
+
+
+# Query strings carry API keys, so they are cut from any URL that ends up in an error message
+_QUERY_STRING = re.compile(r"\?[^\s'\")]*")
+
+
+def _redact(text):
+    return _QUERY_STRING.sub("?<redacted>", str(text))
+
+
+class HttpClientError(Exception):
+    """Raised for failed requests, error statuses and responses that are not JSON."""
+
+
+class QuotaExceededError(HttpClientError):
+    """Raised before sending a request that would go over an API's daily quota."""
+
+
+_session = None
+_session_lock = threading.Lock()
+
+_usage = {}
+_usage_day = None
+_usage_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=MAX_RETRIES,
+                backoff_factor=BACKOFF_FACTOR,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=["GET"],
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+
+def _reserve_quota(api):
+    global _usage_day
+    with _usage_lock:
+        today = date.today()
+        if _usage_day != today:
+            _usage.clear()
+            _usage_day = today
+
+        limit = DAILY_QUOTAS.get(api)
+        used = _usage.get(api, 0)
+        if limit is not None and used >= limit:
+            raise QuotaExceededError(f"Daily quota of {limit} requests for {api} is used up.")
+        _usage[api] = used + 1
+
+
+def quota_usage():
+    """
+    Returns:
+        dict: api name -> {'used': requests sent today, 'limit': daily quota or None}
+    """
+    with _usage_lock:
+        used = dict(_usage) if _usage_day == date.today() else {}
+    return {
+        api: {"used": used.get(api, 0), "limit": DAILY_QUOTAS.get(api)}
+        for api in set(DAILY_QUOTAS) | set(used)
+    }
+
+
+def get_json(url, params=None, api=None, timeout=DEFAULT_TIMEOUT):
+    """
+    GETs `url` through the shared session and decodes the JSON body.
+
+    Args:
+        api (str): name to count the request against in DAILY_QUOTAS
+
+    Returns:
+        dict: the decoded response
+    """
+    if api is not None:
+        _reserve_quota(api)
+
+    try:
+        response = get_session().get(url, params=params, timeout=timeout)
+    except requests.RequestException as e:
+        raise HttpClientError(f"Request to {url} failed: {type(e).__name__}") from e
+
+    try:
+        data = response.json()
+    except ValueError as e:
+        raise HttpClientError(
+            f"{url} returned a non-JSON response (status {response.status_code}): {_redact(response.text[:200])}"
+        ) from e
+
+    if response.status_code >= 400:
+        error = data.get("error", {}) if isinstance(data, dict) else {}
+        message = error.get("message", response.reason) if isinstance(error, dict) else error
+        raise HttpClientError(f"{url} returned status {response.status_code}: {_redact(message)}")
+    return data
@@ -0,0 +1,91 @@
+"""
+Persistent cache of Claude replies, keyed by a fingerprint of everything that determines the
+reply: model ID, system prompt, messages and sampling parameters. Shared by every session and
+process through a SQLite file; entries expire after a TTL and the least recently used ones are
+evicted once the cache grows past its entry or size limit.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+CACHE_PATH = "PelotonDashboard/cache/llm_cache.sqlite"
+CACHE_TTL_SECONDS = 24 * 60 * 60
+MAX_ENTRIES = 500
+MAX_BYTES = 50 * 1024 * 1024
+
+
+def request_fingerprint(model, body):
+    """
+    SHA-256 of the model ID and request body (messages, system prompt, sampling parameters).
+    """
+    payload = json.dumps({"model": model, "body": body}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _connect(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS llm_cache ("
+        "key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER, "
+        "created_at REAL, last_used REAL, expires_at REAL)"
+    )
+    return conn
+
+
+def get_cached_response(key, path=CACHE_PATH):
+    """
+    Returns:
+        str or None: the cached reply, or None when missing or expired
+    """
+    if not os.path.exists(path):
+        return None
+    now = time.time()
+    conn = _connect(path)
+    try:
+        with conn:
+            row = conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def store_response(key, model, response, ttl=CACHE_TTL_SECONDS, path=CACHE_PATH):
+    now = time.time()
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, response, len(response.encode("utf-8")), now, now, now + ttl)
+            )
+            evict(conn)
+    finally:
+        conn.close()
+
+
+def evict(conn, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+    """
+    Drops expired replies, then the least recently used ones until both limits hold.
+    """
+    conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+    count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+    if count <= max_entries and total <= max_bytes:
+        return
+
+    rows = conn.execute("SELECT key, size FROM llm_cache ORDER BY last_used").fetchall()
+    stale = []
+    for key, size in rows:
+        if count <= max_entries and total <= max_bytes:
+            break
+        stale.append((key,))
+        count -= 1
+        total -= size
+    conn.executemany("DELETE FROM llm_cache WHERE key = ?", stale)
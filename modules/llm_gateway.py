@@ -0,0 +1,168 @@
+"""
+Single entry point for every Claude call in the dashboard. Owns one long-lived Bedrock client per
+process (connection pool, timeouts, adaptive retries with backoff on throttling), builds request
+bodies the same way for every caller, answers repeated requests from the on-disk reply cache
+(modules.llm_cache; pass use_cache=False to force a fresh reply) and can be switched to an offline stub backend with
+LLM_BACKEND=stub for testing without AWS credentials.
+"""
+import json
+import os
+import threading
+
+from dotenv import load_dotenv
+
+from modules.llm_cache import get_cached_response, request_fingerprint, store_response
+
+load_dotenv()  # add you own credential to the env file
+load_dotenv("PelotonDashboard/.env")
+
+REGION = "us-west-2"
+ANTHROPIC_VERSION = "bedrock-2023-05-31"
+
+# Model used by the chatbot and the Home summary, and the cheaper one used for page insights
+DEFAULT_MODEL = "anthropic.claude-3-5-sonnet-20240620-v1:0"
+FAST_MODEL = "anthropic.claude-3-haiku-20240307-v1:0"
+SUMMARY_MODEL = "anthropic.claude-3-sonnet-20240229-v1:0"
+
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 120
+# botocore's adaptive mode backs off exponentially (and rate limits the client) on ThrottlingException
+MAX_ATTEMPTS = 6
+MAX_POOL_CONNECTIONS = 10
+
+# "bedrock" or "stub"
+LLM_BACKEND = os.getenv("LLM_BACKEND", "bedrock")
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            import boto3
+            from botocore.config import Config
+
+            _client = boto3.client(
+                "bedrock-runtime",
+                region_name=REGION,
+                config=Config(
+                    connect_timeout=CONNECT_TIMEOUT,
+                    read_timeout=READ_TIMEOUT,
+                    retries={"total_max_attempts": MAX_ATTEMPTS, "mode": "adaptive"},
+                    max_pool_connections=MAX_POOL_CONNECTIONS
+                )
+            )
+    return _client
+
+
+def build_messages(prompt, context=""):
+    """
+    Turns a prompt string, or a chat history that may start with a 'system' message, into the
+    (system, messages) pair of the Anthropic messages API.
+
+    Returns:
+        tuple: (system prompt or None, list of {'role', 'content'} dicts)
+    """
+    if isinstance(prompt, str):
+        content = f"Context:\n{context}\n\nQuestion:\n{prompt}" if context else prompt
+        return None, [{"role": "user", "content": content}]
+
+    system = "\n\n".join(m["content"] for m in prompt if m["role"] == "system") or None
+    messages = [{"role": m["role"], "content": m["content"]} for m in prompt if m["role"] != "system"]
+    if context:
+        system = f"{system}\n\nContext:\n{context}" if system else f"Context:\n{context}"
+    return system, messages
+
+
+def build_request(messages, system=None, max_tokens=2048, temperature=0.7, top_p=None):
+    body = {
+        "anthropic_version": ANTHROPIC_VERSION,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature
+    }
+    if system:
+        body["system"] = system
+    if top_p is not None:
+        body["top_p"] = top_p
+    return body
+
+
+def _stub_reply(body):
+    last = body["messages"][-1]["content"] if body["messages"] else ""
+    return f"[stub response] {' '.join(str(last).split())[:200]}"
+
+
+def invoke(prompt, context="", model=DEFAULT_MODEL, max_tokens=2048, temperature=0.7, top_p=None,
+           use_cache=True):
+    """
+    Sends a prompt string or chat history to Claude and returns the reply text.
+    Errors from Bedrock propagate once the client's retries are exhausted.
+    """
+    system, messages = build_messages(prompt, context)
+    body = build_request(messages, system, max_tokens, temperature, top_p)
+
+    if LLM_BACKEND == "stub":
+        return _stub_reply(body)
+
+    key = request_fingerprint(model, body)
+    if use_cache:
+        cached = get_cached_response(key)
+        if cached is not None:
+            return cached
+
+    response = get_client().invoke_model(
+        modelId=model,
+        contentType="application/json",
+        accept="application/json",
+        body=json.dumps(body)
+    )
+    result = json.loads(response["body"].read().decode("utf-8"))
+    text = result["content"][0]["text"]
+    store_response(key, model, text)
+    return text
+
+
+def stream(prompt, context="", model=DEFAULT_MODEL, max_tokens=2048, temperature=0.7, top_p=None,
+           use_cache=True):
+    """
+    Same request as invoke(), but yields the reply text piece by piece as Bedrock generates it,
+    so callers can render the first words while the rest is still being written. A cached reply
+    is yielded in one piece; a streamed one is cached only once it has completed.
+    """
+    system, messages = build_messages(prompt, context)
+    body = build_request(messages, system, max_tokens, temperature, top_p)
+
+    if LLM_BACKEND == "stub":
+        for word in _stub_reply(body).split(" "):
+            yield word + " "
+        return
+
+    key = request_fingerprint(model, body)
+    if use_cache:
+        cached = get_cached_response(key)
+        if cached is not None:
+            yield cached
+            return
+
+    yield from _stream_and_store(key, model, body)
+
+
+def _stream_and_store(key, model, body):
+    pieces = []
+    response = get_client().invoke_model_with_response_stream(
+        modelId=model,
+        contentType="application/json",
+        accept="application/json",
+        body=json.dumps(body)
+    )
+    for event in response["body"]:
+        if "chunk" not in event:
+            continue
+        chunk = json.loads(event["chunk"]["bytes"].decode("utf-8"))
+        if chunk.get("type") == "content_block_delta" and chunk["delta"].get("type") == "text_delta":
+            pieces.append(chunk["delta"]["text"])
+            yield chunk["delta"]["text"]
+    store_response(key, model, "".join(pieces))
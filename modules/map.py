@@ -1,11 +1,12 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import json
+from modules.data_store import load_table
 
 def render_dma_map(selected_dmas):
-    dma_df = pd.read_csv("PelotonDashboard/data/dma_demo_region.csv", dtype={"dma_code": str})
-    dma_df["dma_region"] = dma_df["dma_region"].str.strip()
+    dma_df = load_table("dma_demo_region", columns=["geo_dma", "dma_code", "dma_region"])
+    dma_df["dma_code"] = dma_df["dma_code"].astype(str)
+    dma_df["dma_region"] = dma_df["dma_region"].astype(str).str.strip()
     dma_df["geo_dma"] = dma_df["geo_dma"].str.strip()
     if selected_dmas:
         dma_df = dma_df[dma_df["dma_region"].isin(selected_dmas)]
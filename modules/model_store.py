@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+
+from modules.forecasting import ARIMA_PARAMS, fit_auto_arima, residual_scale, update_arima
+
+# Fitted models live on local disk so they survive Streamlit reruns and server restarts
+MODEL_DIR = "PelotonDashboard/cache/models"
+MAX_MODELS = 200
+MAX_BYTES = 500 * 1024 * 1024
+
+# Incremental refits fall back to a full order search after this long, or when the old model's
+# forecast error on the new days exceeds its in-sample residual scale by this factor
+FULL_SEARCH_EVERY_DAYS = 7
+MAX_ERROR_RATIO = 2.0
+
+
+def dataset_fingerprint(series):
+    """
+    Hashes the dates and values of a training series so any change to the data gets a new key.
+    """
+    digest = hashlib.sha256()
+    digest.update(np.asarray(series.index.asi8, dtype=np.int64).tobytes())
+    digest.update(np.asarray(series.values, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def model_key(fingerprint, dataset, action, dmas, params=ARIMA_PARAMS):
+    key_parts = {
+        "fingerprint": fingerprint,
+        "dataset": dataset,
+        "action": action or "All",
+        "dmas": sorted(dmas or []),
+        "params": params
+    }
+    return hashlib.sha256(json.dumps(key_parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def lineage_key(dataset, action, dmas, params=ARIMA_PARAMS):
+    """
+    Same as `model_key` without the data fingerprint, so it stays fixed as new days arrive.
+    """
+    return "lineage-" + model_key(None, dataset, action, dmas, params)
+
+
+def _model_path(key):
+    return os.path.join(MODEL_DIR, f"{key}.pkl")
+
+
+def load_model(key):
+    path = _model_path(key)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            model = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+    # Touch the file so eviction sees it as recently used
+    try:
+        os.utime(path, None)
+    except FileNotFoundError:
+        pass
+    return model
+
+
+def save_model(key, model):
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    path = _model_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(model, f)
+    os.replace(tmp_path, path)
+    evict_models()
+
+
+def evict_models(max_models=MAX_MODELS, max_bytes=MAX_BYTES):
+    """
+    Deletes least recently used models until the store fits both the count and size limits.
+    Lineage records are small and are what make incremental updates possible, so they are kept.
+    """
+    if not os.path.isdir(MODEL_DIR):
+        return
+
+    entries = []
+    for name in os.listdir(MODEL_DIR):
+        if not name.endswith(".pkl") or name.startswith("lineage-"):
+            continue
+        path = os.path.join(MODEL_DIR, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            # Evicted by another process between listdir and stat
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    entries.sort()
+    total_bytes = sum(size for _, size, _ in entries)
+    while entries and (len(entries) > max_models or total_bytes > max_bytes):
+        _, size, path = entries.pop(0)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_bytes -= size
+
+
+def get_or_fit_model(series_log, dataset, action, dmas, fit_fn=fit_auto_arima, params=ARIMA_PARAMS):
+    """
+    Returns the cached model for this series and filter selection, fitting and storing it on a miss.
+    """
+    key = model_key(dataset_fingerprint(series_log), dataset, action, dmas, params)
+    model = load_model(key)
+    if model is None:
+        model = fit_fn(series_log)
+        save_model(key, model)
+    return model
+
+
+def get_or_update_model(series_log, dataset, action, dmas, fit_fn=fit_auto_arima, params=ARIMA_PARAMS,
+                        full_search_every_days=FULL_SEARCH_EVERY_DAYS, max_error_ratio=MAX_ERROR_RATIO):
+    """
+    Like `get_or_fit_model`, but when the series only gained new days since the last fit the stored
+    model is updated with just those days instead of re-running the order search.
+    """
+    key = model_key(dataset_fingerprint(series_log), dataset, action, dmas, params)
+    model = load_model(key)
+    if model is not None:
+        return model
+
+    lineage = lineage_key(dataset, action, dmas, params)
+    record = load_model(lineage)
+    model = _try_incremental_update(series_log, record, full_search_every_days, max_error_ratio)
+
+    if model is None:
+        model = fit_fn(series_log)
+        record = {
+            "last_full_search": time.time(),
+            "residual_scale": residual_scale(model)
+        }
+
+    # The lineage record points at the stored model rather than keeping a second copy of it
+    record.update({
+        "model_key": key,
+        "fitted_through": series_log.index[-1],
+        "history_fingerprint": dataset_fingerprint(series_log)
+    })
+    save_model(key, model)
+    save_model(lineage, record)
+    return model
+
+
+def _try_incremental_update(series_log, record, full_search_every_days, max_error_ratio):
+    if record is None or "model_key" not in record:
+        return None
+    if time.time() - record["last_full_search"] > full_search_every_days * 86400:
+        return None
+
+    history = series_log[series_log.index <= record["fitted_through"]]
+    new_obs = series_log[series_log.index > record["fitted_through"]]
+    if new_obs.empty or dataset_fingerprint(history) != record["history_fingerprint"]:
+        # Past values were revised, so the stored state no longer describes this series
+        return None
+
+    previous = load_model(record["model_key"])
+    if previous is None:
+        # Evicted since the last fit
+        return None
+    model, forecast_rmse = update_arima(previous, new_obs.values)
+    if forecast_rmse > max_error_ratio * max(record["residual_scale"], 1e-9):
+        return None
+    return model
@@ -1,18 +1,90 @@
+import json
+import os
+
 import pandas as pd
 import streamlit as st
 
-def run_forecasting_logic():
-    summary = st.session_state.get("time_series_summary", "No forecast summary available.")
-    historical_snippet = st.session_state.get("historical_snippet", "")
-    forecast_snippet = st.session_state.get("forecast_snippet", "")
+from modules.chatbot import CLAUDE_ERROR
+
+# Written by modules/report_runner.py; pages not visited this session fall back to it
+REPORT_PATH = "PelotonDashboard/cache/report/latest.json"
+
+# Topics the Current Events page and the headless report summarize
+EVENT_TOPICS = [
+    "Peloton",
+    "Fitness Industry",
+    "Home Fitness Industry",
+    "Biking Industry"
+]
+
+
+def load_report(path=REPORT_PATH):
+    """
+    Returns:
+        dict: the latest headless report, or {} if it has not been run
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_report(report, path=REPORT_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+    os.replace(tmp_path, path)
+
+
+# Session state keys the pages set that the Home summary is built from
+HOME_INPUT_KEYS = [
+    "time_series_summary",
+    "historical_snippet",
+    "forecast_snippet",
+    "news_summary",
+    "biggest_movers_summary",
+    "dma_movers",
+    "prizm_movers"
+]
+
+
+def report_consolidated_summary():
+    """
+    The headless report's executive summary, when none of Home's inputs were computed in this
+    session and Home would therefore build the same summary from the same report.
+
+    Returns:
+        str or None: the stored summary, or None when it has to be synthesized
+    """
+    if any(key in st.session_state for key in HOME_INPUT_KEYS):
+        return None
+    summary = load_report().get("consolidated_summary")
+    if not summary or summary.startswith(CLAUDE_ERROR):
+        return None
+    return summary
+
+
+def _page_state():
+    # What the pages stored this session, on top of the latest headless report
+    state = load_report()
+    state.update(st.session_state.to_dict())
+    return state
+
+def run_forecasting_logic(state=None):
+    state = _page_state() if state is None else state
+    summary = state.get("time_series_summary", "No forecast summary available.")
+    historical_snippet = state.get("historical_snippet", "")
+    forecast_snippet = state.get("forecast_snippet", "")
     return {
         "forecast_summary": summary,
         "historical_snippet": historical_snippet,
         "forecast_snippet": forecast_snippet
     }
 
-def run_current_events_logic():
-    news_summary = st.session_state.get("news_summary", {})
+def run_current_events_logic(state=None):
+    state = _page_state() if state is None else state
+    news_summary = state.get("news_summary", {})
     if isinstance(news_summary, dict):
         return {
             "event_summary": news_summary.get("summary", "No news summary available."),
@@ -26,14 +98,335 @@ def run_current_events_logic():
         }
 
 
-def run_biggest_movers_logic():
-    summary = st.session_state.get("biggest_movers_summary", "No movers summary available.")
-    dma_df = st.session_state.get("dma_movers")
-    prizm_df = st.session_state.get("prizm_movers")
-    dma_table = dma_df.to_dict("records") if isinstance(dma_df, pd.DataFrame) else []
-    prizm_table = prizm_df.to_dict("records") if isinstance(prizm_df, pd.DataFrame) else []
+def run_biggest_movers_logic(state=None):
+    state = _page_state() if state is None else state
+    summary = state.get("biggest_movers_summary", "No movers summary available.")
+    dma_df = state.get("dma_movers")
+    prizm_df = state.get("prizm_movers")
+    # DataFrames from the page, records from the stored report
+    dma_table = dma_df.to_dict("records") if isinstance(dma_df, pd.DataFrame) else dma_df or []
+    prizm_table = prizm_df.to_dict("records") if isinstance(prizm_df, pd.DataFrame) else prizm_df or []
     return {
         "movers_summary": summary,
         "dma_movers_table": dma_table,
         "prizm_movers_table": prizm_table
     }
+
+
+
+def forecast_snippets(train, comp_series, forecast_index, forecast_peloton, forecast_comp):
+    """
+    Tables of the last 30 days and the forecast for both datasets, as the text fed to the prompts.
+
+    Returns:
+        tuple: (historical_snippet, forecast_snippet)
+    """
+    peloton_last_30 = train.tail(30)
+    if not comp_series.empty:
+        comp_last_30 = comp_series.tail(30)
+    else:
+        # If no competitor data, create dummy data with zeros
+        comp_last_30 = pd.Series([0] * 30, index=peloton_last_30.index)
+
+    historical_df = pd.DataFrame({
+        "Date": peloton_last_30.index,
+        "Historical HitCount for Peloton": peloton_last_30.values,
+        "Historical HitCount for Competitor": comp_last_30.values
+    })
+
+    forecast_df = pd.DataFrame({
+        "Date": forecast_index,
+        "Forecasted HitCount for Peloton": forecast_peloton,
+        "Forecasted HitCount for Competitor": forecast_comp
+    })
+
+    return historical_df.to_string(index=False), forecast_df.to_string(index=False)
+
+
+def build_forecast_insight_messages(historical_snippet, forecast_snippet):
+    """
+    Prompt for the Forecasting page's AI Insight.
+    """
+    return [
+        {
+            "role": "user",
+            "content": f"""
+<Role>
+You are a senior fitness industry analyst. Your task is to identify the biggest industry trend from Peloton vs. competitor engagement data and explain what it means for the market's future.
+</Role>
+
+<Core Focus>
+Look for the one major trend that tells the story of how the fitness industry is evolving right now.
+</Core Focus>
+
+ <Analysis Focus> 
+ **TREND IDENTIFICATION**: What's the dominant pattern? - Momentum shifts, competitive dynamics, market evolution signals
+INDUSTRY IMPACT: What does this mean for the broader fitness market?
+Market maturation, consumer behavior changes, competitive positioning shifts
+STRATEGIC IMPLICATIONS: What should Peloton do about it?
+Immediate opportunities, defensive moves, positioning adjustments
+ </Analysis Focus>
+
+<Required Output Structure>
+### **Industry Trend**:
+2-3 concise sentences identifying the dominant trend for:
+
+1. **Peloton's Competitive Position**: Comment on market share shifts, recent momentum, or performance relative to expectations.
+2. **Broader Fitness Industry Evolution**: Describe high-level consumer behavior trends, technological adoption patterns, or signs of market maturation.
+
+### **Evidence**:
+3-4 bullet points with specific proof from the data:
+- Use percentage changes, growth/decline rates, or comparative metrics between Peloton and its competitor.
+- Highlight timeline-based patterns (e.g., week-over-week or month-over-month changes).
+- Call out any inflection points, convergence/divergence, or trajectory mismatches in forecasts.
+
+### **Market Implications**:
+Analyze what the trend means for the fitness landscape:
+- **Consumer Behavior**: What are users expecting or prioritizing now?
+- **Competitive Dynamics**: How is market power shifting and why?
+- **Industry Stage**: Does this signal disruption, consolidation, or maturity?
+- **Strategic Inflection Point**: What's the next major decision the industry must make?
+
+</Required Output Structure>
+
+Use the Historical Data representing the previous 30 days hit counts and the Forecasted Data representing the next 30 days hit counts to generate a comprehensive analysis of Peloton's market position and future strategy using the required output structure.
+Take note of the detail in the Example and use that to guide your output for using the data given on the Peloton and Competitor engagement data below.
+
+Historical Engagement Data (Last 30 Days) {historical_snippet}
+Forecasted Engagement Data (Next 30 Days) {forecast_snippet}
+
+Focus more on the trends than the numbers because they are not to scale. and get strait to the point of the analysis.
+"""
+        }
+    ]
+
+
+def summarize_movers(start_date, action_type, dma_df, prizm_df):
+    return [
+        {
+            "role": "user",
+            "content": f"""
+You are an expert marketing and business intelligence analyst.
+
+The following data reflects a comparison between activity levels starting from {start_date} for the action type "{action_type}". Metrics represent percent changes in engagement across DMA regions and PRIZM consumer segments.
+
+Top DMA Movers:
+{dma_df.to_markdown(index=False)}
+
+Top PRIZM Segment Movers:
+{prizm_df.to_markdown(index=False)}
+
+Please write an executive summary that includes:
+- The regions and segments with the largest gains and losses
+- Any geographic or demographic trends
+- Suggestions on how Peloton should respond to these shifts
+"""
+        }
+    ]
+
+
+def movers_summary_tables(dma_results, prizm_results, n=5):
+    """
+    Top `n` rows of each mover table with the column names used in the prompt.
+
+    Returns:
+        tuple: (dma_summary_df, prizm_summary_df)
+    """
+    dma_summary_df = dma_results[["dma", "start_count", "end_count", "weighted_pct_change"]].rename(columns={
+        "dma": "Region",
+        "start_count": "Start Count",
+        "end_count": "End Count",
+        "weighted_pct_change": "Adjusted Percent Change"
+    }).head(n)
+
+    prizm_summary_df = prizm_results[["segment", "start_count", "end_count", "weighted_pct_change"]].rename(columns={
+        "segment": "Segment",
+        "start_count": "Start Count",
+        "end_count": "End Count",
+        "weighted_pct_change": "Adjusted Percent Change"
+    }).head(n)
+    return dma_summary_df, prizm_summary_df
+
+
+def combine_search_results(topic_search, sources):
+    """
+    Flattens one topic's search_topics / stream_search output into uniform result dicts,
+    in `sources` order.
+    """
+    all_results = []
+    for group in sources:
+        for r in topic_search["results"].get(group, []):
+            all_results.append({
+                "source": group,
+                "title": r.get("title", "Untitled"),
+                "snippet": r.get("snippet", r.get("text", "")),
+                "link": r.get("link", "")
+            })
+    return all_results
+
+
+def build_topic_prompt(topic, results):
+    """
+    Current Events summary prompt for one topic over its selected search results.
+    """
+    combined_text = "\n\n".join(
+        f"[{r['source']}] {r['title']}\n{r['snippet']}\n{r['link']}" for r in results
+    )
+
+    return f"""
+You are a professional market intelligence analyst. Your job is to analyze recent content from social media, forums, and the web to extract key insights that would be useful for a business leader.
+
+Below is content related to "{topic}". Your output must follow these rules:
+
+1. Identify the **5 most relevant current events or trends** that appear across the sources.
+2. For each, create a short **title** (like a headline), followed by **1-2 sentences** explaining the event in plain language.
+3. Use clear, concise, and professional language.
+4. Avoid speculation. Only summarize what can reasonably be inferred from the sources.
+5. Reference the list of sources directly and supply a date to see recency.
+6. Order news from most recent to oldest.
+7. Use **bold** for the titles of each event.
+8. Use *italics* for the source names.
+9. Use **bullet points** for each event.
+10. Do not add anything else to output besides the summaries.
+
+Make the result visually scannable and useful for brainstorming decisions or strategies. Example format:
+
+**1. Peloton Loses 3 Five-Star Instructors**
+
+Peloton recently parted ways with several top instructors, sparking concern among its loyal user base and raising questions about company culture and retention.
+(Google 2023-10-01 with link to url used)
+
+**Sources:**
+
+- Remember to include the source name, title, and link for each event.
+{combined_text}
+"""
+
+
+def build_summary_messages(forecast_output, events_output, movers_output, reference):
+    """
+    Builds the Home page's executive-summary prompt from the three page outputs and the
+    compacted PRIZM / DMA reference data.
+
+    Args:
+        reference (dict): output of prompt_builder.build_reference_context
+
+    Returns:
+        list: Claude messages
+    """
+    return [
+        {
+            "role": "user",
+            "content": f"""
+You are an executive marketing strategist AI advising Peloton.
+
+You have been provided with multiple AI-generated summaries and supporting data sources. Your job is to **synthesize all of it** into one clear, strategic marketing execution plan. The goal is to give a confident, executive-level recommendation that shows how Peloton is positioned in the industry, who their key audiences are, and what immediate actions they should take to grow and defend market share.
+
+Your response should be structured using the following format:
+
+<Required Output Structure>
+
+### **1. Market Synopsis**  
+Summarize Peloton's competitive standing and what's changing in the fitness industry.  
+This should integrate insights from historical/forecast trends and current events.
+
+- What's Peloton's momentum like?
+- What major shift is happening in the market?
+- Why now is a critical time to act?
+- Make a note about purchases.
+
+### **2. Audience Intelligence**  
+Identify 2-3 of the most important consumer segments or regions to target right now.  
+Base this on:
+- PRIZM segment movers (top gainers or losses)
+- DMA shifts (which cities/regions are changing most)
+- Relevance to the current events summary
+
+For each audience:
+- Name the segment/region
+- What behavior changed?
+- How should Peloton speak to them?
+
+### **3. Strategic Playbook**  
+Lay out a full-spectrum marketing plan across three time horizons:
+
+**Immediate Actions** (next 2-4 weeks):
+Tactical moves tied to current momentum, media cycles, or segment surges.
+
+**Quarterly Strategy** (2-3 months): 
+Positioning, product offers, or cross-platform tactics to convert attention into loyalty.
+
+**Long-Term Advantage** (6+ months):  
+Bold, long-view strategies to solidify Peloton as the market leader in premium connected fitness.
+
+### **4. Confidence Signals**  
+End with 3-5 bullet points that justify why this is the *right* plan based on data.  
+Each point should be based on either:  
+- Forecast/historical trends  
+- Segment behavior  
+- Regional demand changes  
+- Industry news
+
+</Required Output Structure>
+
+---
+**Inputs to consider**:
+
+**1. Forecast Trend Summary** - AI output analyzing the company's performance and future trends.
+{forecast_output['forecast_summary']}
+
+**2. Historical Data Snapshot**  - Where the company's trends been in the last 30 days.
+{forecast_output['historical_snippet']}
+
+**3. Forecasted Engagement Data**  - What the future trend of teh company based on an time series model.
+{forecast_output['forecast_snippet']}
+
+**4. Current Events Summary**  - What the internet is saying about Peloton and the fitness industry.
+{events_output['event_summary']}
+
+**5. PRIZM Segment Specific Insights** - How current events may impact specific PRIZM segments.
+{events_output['prizm_insight']}
+
+**5. Demographic Movers Summary** - AI output summarizing the biggest movers in Peloton's DMA regions.
+{movers_output['movers_summary']}
+
+**6. PRIZM Segment Profiles**  - Profiles of the PRIZM segments referenced by the movers and events.
+{reference['prizm']}
+
+**7. DMA Demographic Overview**  - Demographic data for the DMA regions referenced by the movers and events.
+{reference['dma']}
+
+Do not repeat the inputs verbatim. Instead, **distill and integrate**. Prioritize clarity, confidence, and strategic depth.
+
+Use a professional and executive tone. This is going straight to senior leadership at Peloton.
+ 
+Use some insight from each of the inputs to create a comprehensive, actionable plan. Strait to the point.
+
+- Make sure to include some recommendation in the Quarterly Strategy that incorporates teh news about kettlebells.
+
+"""
+        }
+    ]
+
+
+def build_chat_system_prompt(forecast_output, events_output, movers_output, consolidated_response):
+    """
+    System prompt for the Home chatbot, grounded in the latest page outputs and summary.
+    """
+    return f"""
+You are Claritas AI, a strategic marketing assistant for Peloton. You specialize in interpreting forecasting data, regional trends, and consumer behavior to help executives make high-impact decisions.
+
+You have access to market forecasts, PRIZM segment insights, current events summaries, and an overall company breakdown given in the consolidated_response. Always respond with a confident, helpful tone — your goal is to translate data into action.
+
+Your responses should be concise, professional, and focused on actionable insights.
+
+Your task is to assist Peloton executives by providing clear, data-driven recommendations based on the latest insights, make sure they are thought out and are interesting. Give some details that are potentially too specific as idea starters.
+
+Remember you are used as a brainstorming tool, give recommendations to spark intrigue in teh customer and ask for their input. If they sk for more information get even more specific or if they dont like it get take a step back. Get creative!
+
+Here's the latest context:
+- Forecast Summary: {forecast_output['forecast_summary']}
+- Events: {events_output['event_summary']}
+- Movers: {movers_output['movers_summary']}
+- Main Summary and recommendations: {consolidated_response}
+"""
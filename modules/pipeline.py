@@ -0,0 +1,83 @@
+"""
+Minimal dependency-tracked pipeline. Each stage names the stages it reads from and a function of
+their values; every output is versioned by a fingerprint of its value, and a stage is re-run only
+when the versions of its inputs differ from the ones it was last computed from.
+
+Stages are a dict of name -> (list of input stage names, function). Stages without inputs are
+sources: they are always evaluated (they should be cheap, e.g. reading session state) and only
+their version decides whether anything downstream reruns. A stage that raises (e.g. StageFailed)
+stores nothing, so it is retried on the next run.
+"""
+import hashlib
+import json
+
+import pandas as pd
+
+
+class StageFailed(Exception):
+    """Raised by a stage whose result should be shown but not kept, e.g. an error reply."""
+
+
+def fingerprint(value):
+    """
+    Stable SHA-256 of a stage output: JSON for plain data, row hashes for DataFrames.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest = hashlib.sha256(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+        labels = value.columns if isinstance(value, pd.DataFrame) else [value.name]
+        digest.update(json.dumps([str(label) for label in labels]).encode("utf-8"))
+        return digest.hexdigest()
+    payload = json.dumps(value, sort_keys=True, default=lambda v: fingerprint(v) if isinstance(v, (pd.DataFrame, pd.Series)) else repr(v))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _upstream_order(stages, targets):
+    order, visiting = [], set()
+
+    def visit(name):
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"Pipeline has a cycle through '{name}'.")
+        if name not in stages:
+            raise KeyError(f"Unknown pipeline stage '{name}'.")
+        visiting.add(name)
+        for upstream in stages[name][0]:
+            visit(upstream)
+        visiting.discard(name)
+        order.append(name)
+
+    for target in targets:
+        visit(target)
+    return order
+
+
+def run_pipeline(stages, targets, store, force=()):
+    """
+    Brings `targets` and everything they depend on up to date.
+
+    Args:
+        store (dict-like): keeps each stage's last {'value', 'version', 'input_versions'} between
+            runs, e.g. st.session_state or a plain dict
+        force: stage names to recompute even if their inputs are unchanged
+
+    Returns:
+        tuple: (dict of stage name -> value, set of the stage names that were recomputed)
+    """
+    values, recomputed = {}, set()
+    for name in _upstream_order(stages, targets):
+        inputs, fn = stages[name]
+        input_versions = {upstream: store[upstream]["version"] for upstream in inputs}
+        record = store.get(name)
+
+        if inputs and name not in force and record is not None and record["input_versions"] == input_versions:
+            values[name] = record["value"]
+            continue
+
+        value = fn(*[values[upstream] for upstream in inputs])
+        version = fingerprint(value)
+        if record is None or record["version"] != version or inputs:
+            recomputed.add(name)
+        store[name] = {"value": value, "version": version, "input_versions": input_versions}
+        values[name] = value
+    return values, recomputed
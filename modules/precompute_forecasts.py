@@ -0,0 +1,131 @@
+"""
+Offline job that fits every dataset x action x DMA region combination and writes the
+forecasts to a Parquet artifact the Forecasting Dashboard reads instead of fitting live.
+
+Run from the folder that contains PelotonDashboard/:
+    PYTHONPATH=PelotonDashboard python -m modules.precompute_forecasts --workers 8
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from modules.data_store import DATA_DIR, load_table
+from modules.forecasting import forecast_with_intervals
+from modules.hit_cube import build_cube, cube_daily_series
+from modules.model_store import get_or_update_model
+
+FORECAST_ARTIFACT = os.path.join(DATA_DIR, "precomputed_forecasts.parquet")
+
+# data_store source name -> hit count column
+DATASETS = {
+    "peloton": "hitCount",
+    "competitor": "hitcount"
+}
+
+ALL = "All"
+
+
+def load_dataset(name, data_dir=DATA_DIR):
+    return load_table(name, data_dir=data_dir)
+
+
+def enumerate_combinations(df):
+    """
+    Every action (plus "All") crossed with every single DMA region (plus "All").
+    """
+    actions = [ALL] + sorted(df['action'].dropna().unique().tolist())
+    regions = [ALL] + sorted(df['dma_region'].dropna().unique().tolist())
+    return [(action, region) for action in actions for region in regions]
+
+
+def _fit_combination(dataset, action, region, series):
+    series_log = np.log1p(series)
+    dmas = [] if region == ALL else [region]
+    model = get_or_update_model(series_log, dataset, action, dmas)
+
+    forecast = forecast_with_intervals(model, series)
+    forecast.insert(0, "dataset", dataset)
+    forecast.insert(1, "action", action)
+    forecast.insert(2, "dma_region", region)
+    forecast["fitted_through"] = series.index[-1]
+    return forecast
+
+
+def precompute_forecasts(data_dir=DATA_DIR, output_path=FORECAST_ARTIFACT, max_workers=None):
+    jobs = []
+    for dataset, count_col in DATASETS.items():
+        df = load_dataset(dataset, data_dir)
+        # Same series builder as the Forecasting page, so its fingerprints and fitted_through match
+        cube = build_cube(df, count_col=count_col)
+        for action, region in enumerate_combinations(df):
+            dmas = [] if region == ALL else [region]
+            series = cube_daily_series(cube, action, dmas)
+            if series.empty:
+                continue
+            jobs.append((dataset, action, region, series))
+
+    frames = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_fit_combination, *job): job[:3] for job in jobs}
+        for future in as_completed(futures):
+            dataset, action, region = futures[future]
+            try:
+                frames.append(future.result())
+            except Exception as e:
+                print(f"[WARN] Forecast failed for {dataset} | {action} | {region}: {e}")
+
+    if not frames:
+        raise RuntimeError("No forecasts were produced.")
+
+    result = pd.concat(frames, ignore_index=True)
+    for col in ["dataset", "action", "dma_region"]:
+        result[col] = result[col].astype("category")
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    result.to_parquet(output_path, index=False)
+    return result
+
+
+def load_precomputed_forecasts(path=FORECAST_ARTIFACT):
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+
+def lookup_forecast(forecasts, dataset, action, region, fitted_through=None):
+    """
+    Returns the precomputed forecast rows for one selection, or None when the artifact does not
+    cover it or was built from data older than `fitted_through`.
+    """
+    if forecasts is None:
+        return None
+
+    rows = forecasts[
+        (forecasts['dataset'] == dataset)
+        & (forecasts['action'] == (action or ALL))
+        & (forecasts['dma_region'] == (region or ALL))
+    ]
+    if rows.empty:
+        return None
+    if fitted_through is not None and pd.Timestamp(rows['fitted_through'].iloc[0]) != pd.Timestamp(fitted_through):
+        return None
+    return rows.sort_values('date').reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute dashboard forecasts for every filter combination.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--output", default=FORECAST_ARTIFACT)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    result = precompute_forecasts(args.data_dir, args.output, args.workers)
+    combos = result[['dataset', 'action', 'dma_region']].drop_duplicates()
+    print(f"Wrote {len(combos)} forecasts to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
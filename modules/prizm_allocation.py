@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+
+def build_allocation(df_prizm, dmas):
+    """
+    Compiles the PRIZM2DMA percentages into a (DMA x segment) fraction matrix whose rows follow
+    `dmas`. DMAs without a PRIZM profile get an all-zero row. About 80% of the cells are non-zero,
+    so a dense NumPy array is both smaller and faster than a sparse one here.
+
+    Returns:
+        dict: 'dmas', 'segments' and the 'matrix' of fractions
+    """
+    prizm_frac = df_prizm.set_index('DMA_GCODE').div(100)
+    dmas = np.asarray(dmas)
+    return {
+        "dmas": dmas,
+        "segments": prizm_frac.columns.to_numpy(),
+        "matrix": prizm_frac.reindex(dmas).fillna(0).to_numpy(dtype=float)
+    }
+
+
+def align_allocation(allocation, dmas):
+    """
+    Re-orders the allocation rows to follow `dmas`, with zero rows for DMAs it does not cover.
+    """
+    dmas = np.asarray(dmas)
+    if np.array_equal(allocation["dmas"], dmas):
+        return allocation
+    matrix = pd.DataFrame(allocation["matrix"], index=allocation["dmas"]).reindex(dmas).fillna(0)
+    return {**allocation, "dmas": dmas, "matrix": matrix.to_numpy(dtype=float)}
+
+
+def allocate(hit_matrix, allocation):
+    """
+    Allocates a (rows x DMA) hit matrix, e.g. one row per date, to segments in one matrix multiply.
+
+    Returns:
+        np.ndarray: (rows x segment) hit counts
+    """
+    return np.asarray(hit_matrix, dtype=float) @ allocation["matrix"]
+
+
+def segment_daily_series(cube, allocation, action=None, start=None, end=None):
+    """
+    Daily hitCount per PRIZM segment for a date range, from a hit cube whose DMA axis matches
+    the allocation.
+
+    Returns:
+        pd.DataFrame: dates x segments
+    """
+    if not np.array_equal(cube["dmas"], allocation["dmas"]):
+        raise ValueError("Allocation rows must follow the cube's DMA axis; rebuild it with build_allocation(df_prizm, cube['dmas']).")
+
+    dates = cube["dates"]
+    lo = 0 if start is None else dates.searchsorted(pd.Timestamp(start), side='left')
+    hi = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end), side='right')
+
+    counts = cube["counts"][lo:hi]
+    if action and action != 'All':
+        counts = counts[:, :, cube["actions"] == action]
+
+    return pd.DataFrame(allocate(counts.sum(axis=2), allocation), index=dates[lo:hi], columns=allocation["segments"])
@@ -0,0 +1,145 @@
+"""
+Compacts the reference data that goes into the Home executive-summary prompt. Instead of the full
+PRIZM profile JSON and the whole DMA demographics table, only the PRIZM segments and DMAs the
+current movers and events refer to are included, as pipe-separated rows, in priority order until
+a token budget is reached.
+"""
+import re
+
+import pandas as pd
+
+from modules.result_processing import estimate_tokens
+
+# Estimated tokens each reference block may use
+PRIZM_TOKEN_BUDGET = 1200
+DMA_TOKEN_BUDGET = 600
+
+PRIZM_FIELDS = ["segment_number", "name", "headline", "age", "tenure", "ipa", "tech"]
+DMA_FIELDS = ["dma_code", "geo_dma", "dma_region", "population", "income", "median_age", "college_completion_perc"]
+BEHAVIORS_PER_SEGMENT = 3
+
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", str(text).lower().replace("&", "and")).strip()
+
+
+def referenced_segments(prizm_data, prizm_movers_table, texts):
+    """
+    Segment numbers in priority order: the PRIZM movers first (in their ranking), then segments
+    named in any of `texts`.
+    """
+    ordered = []
+    for row in prizm_movers_table:
+        label = str(row.get("Segment", row.get("segment", "")))
+        number = label.split(" ", 1)[0]
+        if number.isdigit() and number.zfill(2) not in ordered:
+            ordered.append(number.zfill(2))
+
+    corpus = _normalize(" ".join(texts))
+    for profile in prizm_data:
+        if profile["segment_number"] not in ordered and _normalize(profile["name"]) in corpus:
+            ordered.append(profile["segment_number"])
+    return ordered
+
+
+def referenced_dmas(dma_demographics, dma_movers_table, texts):
+    """
+    DMA codes in priority order: the DMA movers first, then DMAs whose name appears in `texts`.
+    """
+    ordered = []
+    for row in dma_movers_table:
+        code = row.get("Region", row.get("dma"))
+        if code is not None and str(code).isdigit() and int(code) not in ordered:
+            ordered.append(int(code))
+
+    corpus = _normalize(" ".join(texts))
+    for code, name in zip(dma_demographics["dma_code"], dma_demographics["geo_dma"]):
+        if int(code) not in ordered and len(str(name)) > 3 and _normalize(name) in corpus:
+            ordered.append(int(code))
+    return ordered
+
+
+def _budgeted_rows(header, rows, token_budget):
+    lines, used = [header], estimate_tokens(header)
+    for row in rows:
+        cost = estimate_tokens(row) + 1
+        if used + cost > token_budget:
+            break
+        lines.append(row)
+        used += cost
+    return "\n".join(lines), len(lines) - 1, used
+
+
+def compact_prizm_profiles(prizm_data, segment_numbers, token_budget=PRIZM_TOKEN_BUDGET):
+    """
+    Returns:
+        tuple: (pipe-separated table text, rows kept, estimated tokens)
+    """
+    by_number = {profile["segment_number"]: profile for profile in prizm_data}
+    rows = []
+    for number in segment_numbers:
+        profile = by_number.get(number)
+        if profile is None:
+            continue
+        behaviors = "; ".join(profile.get("lifestyle_behaviors", [])[:BEHAVIORS_PER_SEGMENT])
+        rows.append(" | ".join([str(profile.get(field, "")) for field in PRIZM_FIELDS] + [behaviors]))
+    return _budgeted_rows(" | ".join(PRIZM_FIELDS + ["behaviors"]), rows, token_budget)
+
+
+def compact_dma_rows(dma_demographics, dma_codes, token_budget=DMA_TOKEN_BUDGET):
+    """
+    Returns:
+        tuple: (pipe-separated table text, rows kept, estimated tokens)
+    """
+    table = dma_demographics.set_index("dma_code", drop=False)
+    rows = []
+    for code in dma_codes:
+        if code not in table.index:
+            continue
+        row = table.loc[code]
+        rows.append(" | ".join(
+            f"{row[field]:.0f}" if field in ("population", "income") and pd.notna(row[field]) else str(row[field])
+            for field in DMA_FIELDS
+        ))
+    return _budgeted_rows(" | ".join(DMA_FIELDS), rows, token_budget)
+
+
+def build_reference_context(movers_output, events_output, prizm_data, dma_demographics,
+                            prizm_budget=PRIZM_TOKEN_BUDGET, dma_budget=DMA_TOKEN_BUDGET):
+    """
+    Selects and compacts the PRIZM profiles and DMA rows referenced by the current movers and
+    events.
+
+    Returns:
+        dict: 'prizm' and 'dma' table texts and 'stats' (rows referenced / kept and estimated tokens)
+    """
+    texts = [
+        movers_output.get("movers_summary", ""),
+        events_output.get("event_summary", ""),
+        events_output.get("prizm_insight", "")
+    ]
+    segments = referenced_segments(prizm_data, movers_output.get("prizm_movers_table", []), texts)
+    dmas = referenced_dmas(dma_demographics, movers_output.get("dma_movers_table", []), texts)
+
+    prizm_text, prizm_kept, prizm_tokens = compact_prizm_profiles(prizm_data, segments, prizm_budget)
+    dma_text, dma_kept, dma_tokens = compact_dma_rows(dma_demographics, dmas, dma_budget)
+    return {
+        "prizm": prizm_text if prizm_kept else "No PRIZM segments are referenced by the current movers or events.",
+        "dma": dma_text if dma_kept else "No DMAs are referenced by the current movers or events.",
+        "stats": {
+            "prizm_segments": {"referenced": len(segments), "kept": prizm_kept, "tokens": prizm_tokens},
+            "dmas": {"referenced": len(dmas), "kept": dma_kept, "tokens": dma_tokens}
+        }
+    }
+
+
+def describe_reference_stats(stats, prompt_tokens):
+    """
+    One-line description of a prompt's size and the reference data that went into it.
+    """
+    prizm, dmas = stats["prizm_segments"], stats["dmas"]
+    return (
+        f"Summary prompt ~{prompt_tokens} tokens, including {prizm['kept']} of {prizm['referenced']} "
+        f"referenced PRIZM segments (~{prizm['tokens']} tokens) and {dmas['kept']} of {dmas['referenced']} "
+        f"referenced DMAs (~{dmas['tokens']} tokens)"
+    )
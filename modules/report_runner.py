@@ -0,0 +1,206 @@
+"""
+Headless run of everything the dashboard computes: forecasts and their AI insight, the biggest
+movers and their summary, Current Events topic summaries and the Home executive summary. The
+three page stages are independent and run in parallel; the synthesis runs once they finish.
+Results are written to page_processors.REPORT_PATH, which the pages fall back to for anything not
+computed in the current session, and every Claude reply lands in the LLM cache, so opening the
+dashboard afterwards replays them instead of regenerating them.
+
+Run from the folder that contains PelotonDashboard/, e.g. from a morning cron job:
+    PYTHONPATH=PelotonDashboard python -m modules.report_runner
+    PYTHONPATH=PelotonDashboard python -m modules.report_runner --stages forecast movers --engine holt_winters
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from modules.biggest_mover_functions import dma_change, prizm_change, ranked_movers
+from modules.chatbot import chat_with_claude
+from modules.data_store import DATA_DIR, load_prizm, load_table
+from modules.forecast_service import forecast_series
+from modules.hit_cube import build_cube, cube_daily_series
+from modules.llm_gateway import FAST_MODEL, invoke
+from modules.page_processors import (
+    EVENT_TOPICS,
+    REPORT_PATH,
+    build_forecast_insight_messages,
+    build_summary_messages,
+    build_topic_prompt,
+    combine_search_results,
+    forecast_snippets,
+    load_report,
+    movers_summary_tables,
+    run_biggest_movers_logic,
+    run_current_events_logic,
+    run_forecasting_logic,
+    save_report,
+    summarize_movers
+)
+from modules.precompute_forecasts import ALL, DATASETS, load_dataset, load_precomputed_forecasts, lookup_forecast
+from modules.prizm_allocation import build_allocation
+from modules.prompt_builder import build_reference_context, describe_reference_stats
+from modules.result_processing import estimate_tokens, select_results
+from modules.search_orchestrator import SEARCH_SOURCES, search_topics
+
+STAGES = ["forecast", "movers", "events"]
+
+# Same default as the Biggest Movers page's start date filter
+MOVERS_START_DATE = "2024-01-01"
+
+
+def run_forecast_stage(engine="auto_arima", data_dir=DATA_DIR):
+    """
+    Forecasts all actions across all regions for both datasets (from the precomputed artifact
+    when it is current) and writes the Forecasting page's AI insight.
+
+    Returns:
+        dict: the session state keys the Forecasting page sets
+    """
+    precomputed = load_precomputed_forecasts()
+    series, forecasts = {}, {}
+    for dataset, count_col in DATASETS.items():
+        series[dataset] = cube_daily_series(build_cube(load_dataset(dataset, data_dir), count_col=count_col), ALL)
+        hit = lookup_forecast(precomputed, dataset, ALL, ALL, series[dataset].index[-1])
+        if hit is not None:
+            forecasts[dataset] = (hit['forecast'].values, pd.DatetimeIndex(hit['date']))
+        else:
+            forecasts[dataset] = forecast_series(series[dataset], dataset, ALL, [], engine=engine)
+
+    forecast_peloton, forecast_index = forecasts["peloton"]
+    historical_snippet, forecast_snippet = forecast_snippets(
+        series["peloton"], series["competitor"], forecast_index, forecast_peloton, forecasts["competitor"][0]
+    )
+    insight = invoke(build_forecast_insight_messages(historical_snippet, forecast_snippet),
+                     model=FAST_MODEL, max_tokens=2048, temperature=0.0)
+    return {
+        "time_series_summary": insight,
+        "historical_snippet": historical_snippet,
+        "forecast_snippet": forecast_snippet
+    }
+
+
+def run_movers_stage(start_date=MOVERS_START_DATE):
+    """
+    Biggest DMA and PRIZM movers from `start_date` to the latest day for all actions, and the
+    Biggest Movers page's AI summary of them.
+
+    Returns:
+        dict: the session state keys the Biggest Movers page sets (tables as records)
+    """
+    columns = ['date', 'dma', 'action', 'hitCount']
+    grouped_cube = build_cube(load_table("peloton_dma_grouped", columns=columns))
+    peloton_cube = build_cube(load_table("peloton_dma", columns=columns))
+    df_prizm = load_prizm()
+    allocation = build_allocation(df_prizm, peloton_cube["dmas"])
+
+    dma_results = ranked_movers(dma_change(cube=grouped_cube, start_date=start_date, sort=False))
+    prizm_results = ranked_movers(prizm_change(None, df_prizm, start_date=start_date, cube=peloton_cube,
+                                               allocation=allocation, sort=False))
+
+    dma_summary_df, prizm_summary_df = movers_summary_tables(dma_results, prizm_results, n=5)
+    summary = invoke(summarize_movers(start_date, "Total Activity", dma_summary_df, prizm_summary_df),
+                     model=FAST_MODEL, max_tokens=2048, temperature=0.5)
+    return {
+        "biggest_movers_summary": summary,
+        "dma_movers": dma_summary_df.to_dict("records"),
+        "prizm_movers": prizm_summary_df.to_dict("records")
+    }
+
+
+def run_events_stage(topics=EVENT_TOPICS, num_results=5):
+    """
+    Searches every topic concurrently and summarizes each one the way the Current Events page does.
+
+    Returns:
+        dict: 'news_summary' (the first topic's summary, as the page stores by default) and
+              'event_topics' (topic -> summary and sources)
+    """
+    search_output = search_topics(topics, num_results=num_results, recency="365d")
+
+    def summarize(topic):
+        results = select_results(combine_search_results(search_output[topic], SEARCH_SOURCES), topic)
+        return topic, {"summary": chat_with_claude(build_topic_prompt(topic, results)), "sources": results}
+
+    with ThreadPoolExecutor(max_workers=len(topics)) as executor:
+        event_topics = dict(executor.map(summarize, topics))
+    return {
+        "news_summary": event_topics[topics[0]]["summary"],
+        "event_topics": event_topics
+    }
+
+
+def run_synthesis_stage(report):
+    """
+    The Home page's executive summary, from the same inputs Home would build it from.
+    """
+    with open("PelotonDashboard/data/prizm_descriptions.json", "r", encoding="utf-8") as f:
+        prizm_data = json.load(f)
+    events_output = run_current_events_logic(report)
+    movers_output = run_biggest_movers_logic(report)
+    reference = build_reference_context(movers_output, events_output, prizm_data, load_table("dma_demo_region"))
+    messages = build_summary_messages(run_forecasting_logic(report), events_output, movers_output, reference)
+    return {
+        "consolidated_summary": chat_with_claude(messages),
+        "summary_prompt_tokens": estimate_tokens(messages[0]["content"]),
+        "summary_reference_stats": reference["stats"]
+    }
+
+
+def run_report(stages=STAGES, engine="auto_arima", start_date=MOVERS_START_DATE, topics=EVENT_TOPICS,
+               output=REPORT_PATH):
+    """
+    Runs the selected page stages in parallel, then the synthesis, and saves the report.
+    Stages that are not selected keep their values from the previous report.
+    """
+    report = load_report(output)
+    stage_fns = {
+        "forecast": lambda: run_forecast_stage(engine),
+        "movers": lambda: run_movers_stage(start_date),
+        "events": lambda: run_events_stage(topics)
+    }
+
+    timings = {}
+
+    def timed(name):
+        start = time.perf_counter()
+        result = stage_fns[name]()
+        timings[name] = time.perf_counter() - start
+        return result
+
+    with ThreadPoolExecutor(max_workers=len(stages)) as executor:
+        futures = {name: executor.submit(timed, name) for name in stages}
+        for name, future in futures.items():
+            report.update(future.result())
+
+    start = time.perf_counter()
+    report.update(run_synthesis_stage(report))
+    timings["synthesis"] = time.perf_counter() - start
+
+    report["generated_at"] = datetime.now().isoformat(timespec="seconds")
+    report["stage_seconds"] = timings
+    save_report(report, output)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute the full dashboard report without Streamlit.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--engine", default="auto_arima")
+    parser.add_argument("--start-date", default=MOVERS_START_DATE)
+    parser.add_argument("--topics", nargs="+", default=EVENT_TOPICS)
+    parser.add_argument("--output", default=REPORT_PATH)
+    args = parser.parse_args()
+
+    report = run_report(args.stages, args.engine, args.start_date, args.topics, args.output)
+    for name, seconds in report["stage_seconds"].items():
+        print(f"{name:<10} {seconds:.1f}s")
+    print(describe_reference_stats(report["summary_reference_stats"], report["summary_prompt_tokens"]))
+    print(f"Wrote report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
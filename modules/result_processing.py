@@ -0,0 +1,146 @@
+import math
+import re
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {"fbclid", "gclid", "igshid", "ref", "ref_src", "si", "feature"}
+
+# Hosts that serve the same content under another name
+HOST_ALIASES = {
+    "x.com": "twitter.com",
+    "mobile.twitter.com": "twitter.com",
+    "old.reddit.com": "reddit.com",
+    "m.youtube.com": "youtube.com",
+    "youtu.be": "youtube.com"
+}
+
+# Results whose title + snippet shingles overlap at least this much (estimated Jaccard) are duplicates
+NEAR_DUPLICATE_SIMILARITY = 0.7
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 64
+
+# Defaults for how much search context goes into a summarization prompt
+MAX_PROMPT_RESULTS = 20
+PROMPT_TOKEN_BUDGET = 3000
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(7)
+_HASH_A = _rng.integers(1, _MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+_HASH_B = _rng.integers(0, _MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def canonical_url(url):
+    """
+    Normalizes a result link so the same page found through different sources compares equal:
+    lower-cased host without 'www.', known mirror hosts folded together, no fragment, no
+    tracking parameters and no trailing slash.
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    host = HOST_ALIASES.get(host, host)
+
+    path = parts.path.rstrip("/")
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith("utm_")
+    ]
+    if parts.netloc.lower() == "youtu.be" and path:
+        query = [("v", path.lstrip("/"))] + query
+        path = "/watch"
+
+    return urlunsplit(("https", host, path, urlencode(sorted(query)), ""))
+
+
+def _tokens(text):
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+def _result_text(result):
+    return f"{result.get('title', '')} {result.get('snippet', '')}"
+
+
+def estimate_tokens(text):
+    """
+    Rough LLM token count for English text (about 4 characters per token).
+    """
+    return math.ceil(len(text) / 4)
+
+
+def minhash_signature(text, shingle_size=SHINGLE_SIZE):
+    """
+    MinHash of the text's word shingles; the share of equal positions between two signatures
+    estimates the Jaccard similarity of their shingle sets.
+    """
+    words = _tokens(text)
+    shingles = {" ".join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))}
+    hashes = np.array([zlib.crc32(shingle.encode("utf-8")) for shingle in shingles], dtype=np.uint64)
+    # (a * x + b) mod p per permutation; with a, x < 2**31 the product fits in uint64
+    x = (hashes % np.uint64(_MERSENNE_PRIME))[:, None]
+    return ((_HASH_A * x + _HASH_B) % np.uint64(_MERSENNE_PRIME)).min(axis=0)
+
+
+def bm25_scores(query, documents, k1=1.5, b=0.75):
+    """
+    Okapi BM25 relevance of each document to the query.
+
+    Returns:
+        np.ndarray: one score per document
+    """
+    doc_tokens = [_tokens(doc) for doc in documents]
+    if not doc_tokens:
+        return np.zeros(0)
+    lengths = np.array([len(tokens) for tokens in doc_tokens], dtype=float)
+    avg_length = lengths.mean() or 1.0
+
+    scores = np.zeros(len(documents))
+    for term in set(_tokens(query)):
+        freqs = np.array([tokens.count(term) for tokens in doc_tokens], dtype=float)
+        n_containing = np.count_nonzero(freqs)
+        idf = math.log(1 + (len(documents) - n_containing + 0.5) / (n_containing + 0.5))
+        scores += idf * freqs * (k1 + 1) / (freqs + k1 * (1 - b + b * lengths / avg_length))
+    return scores
+
+
+def select_results(results, query, max_results=MAX_PROMPT_RESULTS, token_budget=PROMPT_TOKEN_BUDGET,
+                   similarity=NEAR_DUPLICATE_SIMILARITY):
+    """
+    Prepares search results for a prompt: drops repeated links, ranks the rest by BM25 against
+    the query, skips near-duplicates of a better-ranked result and keeps the best ones until
+    `max_results` or `token_budget` (estimated over title + snippet + link) is reached.
+
+    Returns:
+        list: the kept results, most relevant first
+    """
+    unique, seen_urls = [], set()
+    for result in results:
+        url = canonical_url(result.get("link", ""))
+        if url and url in seen_urls:
+            continue
+        seen_urls.add(url)
+        unique.append(result)
+
+    scores = bm25_scores(query, [_result_text(result) for result in unique])
+    order = sorted(range(len(unique)), key=lambda i: -scores[i])
+
+    kept, signatures, tokens_used = [], [], 0
+    for i in order:
+        if len(kept) >= max_results:
+            break
+        result = unique[i]
+        signature = minhash_signature(_result_text(result))
+        if any(np.mean(signature == other) >= similarity for other in signatures):
+            continue
+        cost = estimate_tokens(f"{_result_text(result)} {result.get('link', '')}")
+        if tokens_used + cost > token_budget:
+            continue
+        kept.append(result)
+        signatures.append(signature)
+        tokens_used += cost
+    return kept
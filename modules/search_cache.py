@@ -0,0 +1,96 @@
+"""
+Persistent cache for web search results, shared by every Streamlit session and process on the
+machine. Entries live in a small SQLite file keyed by (normalized query, num_results, recency,
+source, page start) and expire sooner for narrower recency windows, since those results go
+stale faster.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+CACHE_PATH = "PelotonDashboard/cache/search_cache.sqlite"
+
+# google_search.RECENCY_MAP key -> seconds a cached result stays valid;
+# any other recency uses DEFAULT_TTL
+CACHE_TTL_SECONDS = {
+    "7d": 60 * 60,
+    "30d": 6 * 60 * 60,
+    "90d": 12 * 60 * 60,
+    "180d": 24 * 60 * 60,
+    "365d": 24 * 60 * 60
+}
+DEFAULT_TTL = 24 * 60 * 60
+
+
+def normalize_query(query):
+    return re.sub(r"\s+", " ", query.strip().lower())
+
+
+def cache_key(query, num_results, recency, source, start=1):
+    parts = [normalize_query(query), int(num_results), recency, source]
+    if start != 1:
+        parts.append(int(start))
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+def _connect(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS search_cache ("
+        "key TEXT PRIMARY KEY, source TEXT, query TEXT, results TEXT, created_at REAL, expires_at REAL)"
+    )
+    return conn
+
+
+def get_cached_results(query, num_results, recency, source, start=1, path=CACHE_PATH):
+    """
+    Returns:
+        list or None: the cached results, or None when missing or expired
+    """
+    if not os.path.exists(path):
+        return None
+    conn = _connect(path)
+    try:
+        row = conn.execute(
+            "SELECT results FROM search_cache WHERE key = ? AND expires_at > ?",
+            (cache_key(query, num_results, recency, source, start), time.time())
+        ).fetchone()
+    finally:
+        conn.close()
+    return json.loads(row[0]) if row else None
+
+
+def store_results(query, num_results, recency, source, results, start=1, path=CACHE_PATH):
+    now = time.time()
+    ttl = CACHE_TTL_SECONDS.get(recency, DEFAULT_TTL)
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key(query, num_results, recency, source, start), source, normalize_query(query),
+                 json.dumps(results), now, now + ttl)
+            )
+    finally:
+        conn.close()
+
+
+def cached_search(search_fn, query, num_results, recency, source, start=1, use_cache=True, path=CACHE_PATH):
+    """
+    Returns the cached results for this search if they are still fresh, otherwise calls
+    `search_fn()` and stores what it returns. Failed searches raise and are never cached.
+    """
+    if use_cache:
+        results = get_cached_results(query, num_results, recency, source, start, path)
+        if results is not None:
+            return results
+
+    results = search_fn()
+    store_results(query, num_results, recency, source, results, start, path)
+    return results
@@ -0,0 +1,124 @@
+import atexit
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from modules.google_search import google_search_snippets
+from modules.result_processing import canonical_url
+from modules.reddit_search import search_reddit
+from modules.twitter_search import search_twitter
+from modules.youtube_search import search_youtube
+
+# source name -> search function(query, num_results, recency)
+SEARCH_SOURCES = {
+    "Google": google_search_snippets,
+    "Reddit": search_reddit,
+    "Twitter": search_twitter,
+    "YouTube": search_youtube
+}
+
+# Searches are I/O bound, so threads are enough; this caps how many hit the APIs at once
+MAX_CONCURRENT_SEARCHES = 8
+
+# Seconds the whole fan-out may take; anything still running is reported as timed out
+SEARCH_DEADLINE = 20
+
+# The Custom Search API returns at most 10 results per call and nothing past rank 100
+PAGE_SIZE = 10
+MAX_DEPTH = 100
+
+# One pool per server process; Streamlit keeps imported modules alive across reruns
+_executor = None
+
+
+def get_search_executor(max_workers=MAX_CONCURRENT_SEARCHES):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search")
+        atexit.register(_executor.shutdown, wait=False, cancel_futures=True)
+    return _executor
+
+
+def _pages(depth):
+    """
+    Splits `depth` results into (start, num) API calls of at most PAGE_SIZE results each.
+    """
+    depth = min(depth, MAX_DEPTH)
+    return [(start, min(PAGE_SIZE, depth - start + 1)) for start in range(1, depth + 1, PAGE_SIZE)]
+
+
+def stream_search(topics, depth=PAGE_SIZE, recency=None, sources=None, deadline=SEARCH_DEADLINE):
+    """
+    Pages every topic x source search `depth` results deep with all pages in flight at once,
+    and yields each page as soon as it arrives. Links already seen for the topic, from any
+    source, are dropped by canonical URL. A failing or slow page only drops its own results.
+
+    Yields:
+        dict: 'topic', 'source', 'results' (the page's new results) and 'error' (None or a message)
+    """
+    sources = sources or list(SEARCH_SOURCES)
+    executor = get_search_executor()
+
+    pending = {
+        executor.submit(SEARCH_SOURCES[source], topic, num_results=num, recency=recency, start=start): (topic, source)
+        for topic in topics
+        for source in sources
+        for start, num in _pages(depth)
+    }
+    seen = {topic: set() for topic in topics}
+
+    try:
+        stop_at = time.monotonic() + deadline
+        while pending:
+            remaining = stop_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                topic, source = pending.pop(future)
+                try:
+                    page = future.result()
+                except Exception as e:
+                    yield {"topic": topic, "source": source, "results": [], "error": str(e)}
+                    continue
+
+                new_results = []
+                for result in page:
+                    url = canonical_url(result.get("link", ""))
+                    if url and url in seen[topic]:
+                        continue
+                    seen[topic].add(url)
+                    new_results.append(result)
+                yield {"topic": topic, "source": source, "results": new_results, "error": None}
+
+        for topic, source in pending.values():
+            yield {"topic": topic, "source": source, "results": [], "error": f"timed out after {deadline}s"}
+    finally:
+        # Also runs when the caller stops iterating early
+        for future in pending:
+            future.cancel()
+
+
+def search_topics(topics, num_results=5, recency=None, sources=None, deadline=SEARCH_DEADLINE):
+    """
+    Runs every topic x source search concurrently and collects whatever finishes before the
+    deadline, without links repeated across sources. A failing or slow source only drops its
+    own results.
+
+    Returns:
+        dict: topic -> {'results': {source: [result dicts]}, 'errors': {source: message}}
+    """
+    sources = sources or list(SEARCH_SOURCES)
+    output = {topic: {"results": {}, "errors": {}} for topic in topics}
+
+    for page in stream_search(topics, num_results, recency, sources, deadline):
+        topic_output = output[page["topic"]]
+        if page["error"]:
+            topic_output["errors"][page["source"]] = page["error"]
+        else:
+            topic_output["results"].setdefault(page["source"], []).extend(page["results"])
+
+    # Completion order is arbitrary; keep sources in the order they were asked for
+    for topic_output in output.values():
+        results = topic_output["results"]
+        topic_output["results"] = {source: results[source] for source in sources if source in results}
+    return output
@@ -1,6 +1,6 @@
 from modules.google_search import google_search_snippets  # reused for fallback
 
-def search_youtube(query, num_results=5, recency=None):
+def search_youtube(query, num_results=5, recency=None, start=1):
     youtube_query = f"{query} site:youtube.com"
-    results = google_search_snippets(youtube_query, num_results=num_results, recency=recency)
+    results = google_search_snippets(youtube_query, num_results=num_results, recency=recency, source="YouTube", start=start)
     return [{"source": "YouTube", **r} for r in results]
@@ -1,13 +1,16 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-from pmdarima import auto_arima
 import numpy as np
-from dotenv import load_dotenv
 import os
-import json
 from modules.map import render_dma_map
-import boto3
+from modules.data_store import load_table
+from modules.hit_cube import build_cube, cube_daily_series
+from modules.forecast_service import submit_forecasts
+from modules.hierarchical_forecast import build_hierarchical_forecast, select_forecast
+from modules.precompute_forecasts import DATASETS, FORECAST_ARTIFACT, load_dataset, load_precomputed_forecasts, lookup_forecast
+from modules.llm_gateway import FAST_MODEL, stream
+from modules.page_processors import build_forecast_insight_messages, forecast_snippets
 
 # Custom styling
 st.markdown("""
@@ -100,7 +103,27 @@ st.markdown(
 
 
 # Load and preprocess data
-df = pd.read_csv("PelotonDashboard/data/new_peloton_data_with_region.csv", parse_dates=['date'])
+df = load_table("peloton", columns=['action', 'dma_region'])
+
+# Forecasts written by modules/precompute_forecasts.py, if the batch job has been run.
+# The file's mtime is part of the cache key, so a rerun of the job is picked up without a restart.
+@st.cache_data
+def load_forecast_artifact(mtime):
+    return load_precomputed_forecasts()
+
+precomputed_forecasts = load_forecast_artifact(
+    os.path.getmtime(FORECAST_ARTIFACT) if os.path.exists(FORECAST_ARTIFACT) else None
+)
+
+# Daily date x region x action cubes; filter + sum is an array slice instead of a groupby
+@st.cache_resource
+def load_cube(dataset):
+    return build_cube(load_dataset(dataset), count_col=DATASETS[dataset])
+
+# Fast preview answers any filter by summing reconciled per-DMA forecasts
+@st.cache_data
+def load_hierarchy(dataset):
+    return build_hierarchical_forecast(load_dataset(dataset), count_col=DATASETS[dataset], engine="holt_winters")
 
 # --- Filters
 action_options = df['action'].unique().tolist()
@@ -133,229 +156,132 @@ with col2:
 
     show_map = st.checkbox("Show DMA Map", value=False, key="toggle_map")
 
+    fast_preview = st.checkbox("Fast Preview (Holt-Winters)", value=False, key="fast_preview")
+
+def plot_hitcount(recent, label, title, forecast_index=None, forecast=None):
+    fig, ax = plt.subplots(figsize=(14, 5))
+    ax.plot(recent.index, recent, label=label)
+    if forecast is not None:
+        ax.plot(forecast_index, forecast, label='Forecast', color='green')
+    ax.set_title(title)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("HitCount")
+    ax.legend()
+    return fig
+
 # -- ARIMA Forecasting (Main left panel)
 with col1:
     st.markdown("<div class='section-title'>Forecast</div>", unsafe_allow_html=True)
 
-    filtered_df = df.copy()
-    if selected_action != 'All':
-        filtered_df = filtered_df[filtered_df['action'] == selected_action]
-    if selected_dmas:
-        filtered_df = filtered_df[filtered_df['dma_region'].isin(selected_dmas)]
-
-    daily_df = filtered_df.groupby('date')['hitCount'].sum().reset_index()
-    daily_df.set_index('date', inplace=True)
-    daily_df = daily_df.asfreq('D', fill_value=0)
-    train = daily_df['hitCount']
+    train = cube_daily_series(load_cube("peloton"), selected_action, selected_dmas)
     train_log = np.log1p(train)
 
     if train_log.empty:
         st.error("No data available to train. Adjust filters.")
         st.stop()
 
-    with st.spinner("Training Auto ARIMA..."):
-        model = auto_arima(
-            train_log,
-            seasonal=True,
-            m=7,
-            d=1,
-            D=1,
-            trace=False,
-            error_action='ignore',
-            suppress_warnings=True,
-            stepwise=True
-        )
-
-    forecast_log = model.predict(n_periods=30)
-    forecast_peloton = np.expm1(forecast_log)
-    forecast_index_peloton = pd.date_range(
-        start=train.index[-1] + pd.Timedelta(days=1),
-        periods=30,
-        freq='D'
-    )
+    # Precomputed forecasts cover "All" or a single region; anything else is fitted live
+    all_selected = set(selected_dmas) == set(dma_options)
+    # "All regions" is keyed as no DMA filter, the way precompute_forecasts stores its models
+    forecast_dmas = [] if all_selected else selected_dmas
+    if all_selected or not selected_dmas:
+        lookup_region = "All"
+    elif len(selected_dmas) == 1:
+        lookup_region = selected_dmas[0]
+    else:
+        lookup_region = None
+
+    peloton_lookup = None
+    if lookup_region and not fast_preview:
+        peloton_lookup = lookup_forecast(precomputed_forecasts, "peloton", selected_action, lookup_region, train.index[-1])
+
+    # Misses are fitted in the process pool while the historical charts render
+    peloton_future = None
+    forecast_peloton, forecast_index_peloton = None, None
+    if peloton_lookup is not None:
+        forecast_peloton = peloton_lookup['forecast'].values
+        forecast_index_peloton = pd.DatetimeIndex(peloton_lookup['date'])
+    elif fast_preview:
+        peloton_hierarchy = load_hierarchy("peloton")
+        forecast_peloton = select_forecast(peloton_hierarchy, selected_action, selected_dmas)
+        # The selected series can end before the dataset does once its trailing zero days are trimmed
+        forecast_index_peloton = pd.date_range(start=train.index[-1] + pd.Timedelta(days=1),
+                                               periods=len(forecast_peloton), freq='D')
+    else:
+        peloton_future = submit_forecasts({
+            "peloton": (train, "peloton", selected_action, forecast_dmas)
+        })["peloton"]
 
-    fig, ax = plt.subplots(figsize=(14, 5))
     recent_train = train.last(f"{days_to_show}D")
-    ax.plot(recent_train.index, recent_train, label='Peloton HitCount')
-    ax.plot(forecast_index_peloton, forecast_peloton, label='Forecast', color='green')
-    all_selected = set(selected_dmas) == set(dma_options)
     dma_label = "All Regions" if all_selected else ", ".join(selected_dmas)
     action_label = selected_action if selected_action != 'All' else "All Actions"
-    ax.set_title(f"Peloton |{action_label} | {dma_label}")
-    ax.set_xlabel("Date")
-    ax.set_ylabel("HitCount")
-    ax.legend()
-    st.pyplot(fig)
+    peloton_title = f"Peloton |{action_label} | {dma_label}"
+    peloton_chart = st.empty()
+    peloton_chart.pyplot(plot_hitcount(recent_train, 'Peloton HitCount', peloton_title, forecast_index_peloton, forecast_peloton))
 
 # --- Competitor Data
-competitor_df = pd.read_csv("PelotonDashboard/data/new_competitor_data_with_region.csv")
-
 with col1:
     st.markdown("<div class='section-title'>Competitor Time Series Overview</div>", unsafe_allow_html=True)
 
-    competitor_filtered = competitor_df.copy()
-    if selected_action != 'All':
-        competitor_filtered = competitor_filtered[competitor_filtered['action'] == selected_action]
-    if selected_dmas:
-        competitor_filtered = competitor_filtered[competitor_filtered['dma_region'].isin(selected_dmas)]
-
-    competitor_daily = competitor_filtered.groupby('date')['hitcount'].sum().reset_index()
-    competitor_daily.set_index('date', inplace=True)
-    competitor_daily.index = pd.to_datetime(competitor_daily.index)
-    competitor_daily = competitor_daily.asfreq('D', fill_value=0)
-
-    comp_series = competitor_daily['hitcount']
+    comp_series = cube_daily_series(load_cube("competitor"), selected_action, selected_dmas)
     comp_series_log = np.log1p(comp_series)
 
+    comp_future = None
     if comp_series_log.empty:
         st.warning("No competitor data available for selected filters.")
         forecast_comp = [0] * 30
-        forecast_index_comp = pd.date_range(start=forecast_index_peloton[0], periods=30, freq='D')
+        forecast_index_comp = pd.date_range(start=train.index[-1] + pd.Timedelta(days=1), periods=30, freq='D')
     else:
-        with st.spinner("Training Auto ARIMA on Competitor Data..."):
-            comp_model = auto_arima(
-                comp_series_log,
-                seasonal=True,
-                m=7,
-                d=1,
-                D=1,
-                trace=False,
-                error_action='ignore',
-                suppress_warnings=True,
-                stepwise=True
-            )
-        forecast_log_comp = comp_model.predict(n_periods=30)
-        forecast_comp = np.expm1(forecast_log_comp)
-        forecast_index_comp = pd.date_range(start=comp_series.index[-1] + pd.Timedelta(days=1), periods=30, freq='D')
-
-        fig2, ax2 = plt.subplots(figsize=(14, 5))
+        comp_lookup = None
+        if lookup_region and not fast_preview:
+            comp_lookup = lookup_forecast(precomputed_forecasts, "competitor", selected_action, lookup_region, comp_series.index[-1])
+
+        forecast_comp, forecast_index_comp = None, None
+        if comp_lookup is not None:
+            forecast_comp = comp_lookup['forecast'].values
+            forecast_index_comp = pd.DatetimeIndex(comp_lookup['date'])
+        elif fast_preview:
+            comp_hierarchy = load_hierarchy("competitor")
+            forecast_comp = select_forecast(comp_hierarchy, selected_action, selected_dmas)
+            forecast_index_comp = pd.date_range(start=comp_series.index[-1] + pd.Timedelta(days=1),
+                                                periods=len(forecast_comp), freq='D')
+        else:
+            comp_future = submit_forecasts({
+                "competitor": (comp_series, "competitor", selected_action, forecast_dmas)
+            })["competitor"]
+
         recent_comp = comp_series.last(f"{days_to_show}D")
-        ax2.plot(recent_comp.index, recent_comp, label='Competitor HitCount')
-        ax2.plot(forecast_index_comp, forecast_comp, label='Forecast', color='green')
-        ax2.set_title(f"Competitor | {action_label} | {dma_label}")
-        ax2.set_xlabel("Date")
-        ax2.set_ylabel("HitCount")
-        ax2.legend()
-        st.pyplot(fig2)
+        comp_title = f"Competitor | {action_label} | {dma_label}"
+        comp_chart = st.empty()
+        comp_chart.pyplot(plot_hitcount(recent_comp, 'Competitor HitCount', comp_title, forecast_index_comp, forecast_comp))
 
         if show_map:
             st.markdown("<div class='section-title'>DMA Coverage Map</div>", unsafe_allow_html=True)
             st.plotly_chart(render_dma_map(selected_dmas), use_container_width=True)
 
+    # --- Wait for pooled fits and redraw the charts with their forecasts
+    if peloton_future is not None or comp_future is not None:
+        with st.spinner("Training Auto ARIMA..."):
+            if peloton_future is not None:
+                forecast_peloton, forecast_index_peloton = peloton_future.result()
+                peloton_chart.pyplot(plot_hitcount(recent_train, 'Peloton HitCount', peloton_title, forecast_index_peloton, forecast_peloton))
+            if comp_future is not None:
+                forecast_comp, forecast_index_comp = comp_future.result()
+                comp_chart.pyplot(plot_hitcount(recent_comp, 'Competitor HitCount', comp_title, forecast_index_comp, forecast_comp))
+
 # --- AI Insight
 # Claritas-style blue divider
 st.markdown("<div style='border-top: 2px solid #74C2E1; margin: 10px 0 20px 0;'></div>", unsafe_allow_html=True)
 st.markdown("<div class='section-title'>AI Insight</div>", unsafe_allow_html=True)
 
-load_dotenv("PelotonDashboard/.env")
-client = boto3.client(
-    "bedrock-runtime",
-    region_name="us-west-2",
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-    aws_session_token=os.getenv("AWS_SESSION_TOKEN")
-)
+# Last 30 days and the forecast as text tables for the prompt
+historical_snippet, forecast_snippet = forecast_snippets(train, comp_series, forecast_index_peloton, forecast_peloton, forecast_comp)
+messages = build_forecast_insight_messages(historical_snippet, forecast_snippet)
 
-peloton_last_30 = train.tail(30)
-if not comp_series.empty:
-    comp_last_30 = comp_series.tail(30)
-else:
-    # If no competitor data, create dummy data with zeros
-    comp_last_30 = pd.Series([0] * 30, index=peloton_last_30.index)
-
-# Create comprehensive summary with both historical and forecast data
-historical_df = pd.DataFrame({
-    "Date": peloton_last_30.index,
-    "Historical HitCount for Peloton": peloton_last_30.values,
-    "Historical HitCount for Competitor": comp_last_30.values
-})
-
-forecast_df = pd.DataFrame({
-    "Date": forecast_index_peloton,
-    "Forecasted HitCount for Peloton": forecast_peloton,
-    "Forecasted HitCount for Competitor": forecast_comp
-})
-
-# Combine historical and forecast data
-combined_summary = pd.concat([
-    historical_df.add_suffix('_Historical'),
-    forecast_df.add_suffix('_Forecast')
-], axis=0).reset_index(drop=True)
-
-# Create a more readable format for the AI
-historical_snippet = historical_df.to_string(index=False)
-forecast_snippet = forecast_df.to_string(index=False)
-
-messages = [
-    {
-        "role": "user",
-        "content": f"""
-<Role>
-You are a senior fitness industry analyst. Your task is to identify the biggest industry trend from Peloton vs. competitor engagement data and explain what it means for the market's future.
-</Role>
-
-<Core Focus>
-Look for the one major trend that tells the story of how the fitness industry is evolving right now.
-</Core Focus>
-
- <Analysis Focus> 
- **TREND IDENTIFICATION**: What's the dominant pattern? - Momentum shifts, competitive dynamics, market evolution signals
-INDUSTRY IMPACT: What does this mean for the broader fitness market?
-Market maturation, consumer behavior changes, competitive positioning shifts
-STRATEGIC IMPLICATIONS: What should Peloton do about it?
-Immediate opportunities, defensive moves, positioning adjustments
- </Analysis Focus>
-
-<Required Output Structure>
-### **Industry Trend**:
-2-3 concise sentences identifying the dominant trend for:
-
-1. **Peloton's Competitive Position**: Comment on market share shifts, recent momentum, or performance relative to expectations.
-2. **Broader Fitness Industry Evolution**: Describe high-level consumer behavior trends, technological adoption patterns, or signs of market maturation.
-
-### **Evidence**:
-3-4 bullet points with specific proof from the data:
-- Use percentage changes, growth/decline rates, or comparative metrics between Peloton and its competitor.
-- Highlight timeline-based patterns (e.g., week-over-week or month-over-month changes).
-- Call out any inflection points, convergence/divergence, or trajectory mismatches in forecasts.
-
-### **Market Implications**:
-Analyze what the trend means for the fitness landscape:
-- **Consumer Behavior**: What are users expecting or prioritizing now?
-- **Competitive Dynamics**: How is market power shifting and why?
-- **Industry Stage**: Does this signal disruption, consolidation, or maturity?
-- **Strategic Inflection Point**: What's the next major decision the industry must make?
-
-</Required Output Structure>
-
-Use the Historical Data representing the previous 30 days hit counts and the Forecasted Data representing the next 30 days hit counts to generate a comprehensive analysis of Peloton's market position and future strategy using the required output structure.
-Take note of the detail in the Example and use that to guide your output for using the data given on the Peloton and Competitor engagement data below.
-
-Historical Engagement Data (Last 30 Days) {historical_snippet}
-Forecasted Engagement Data (Next 30 Days) {forecast_snippet}
-
-Focus more on the trends than the numbers because they are not to scale. and get strait to the point of the analysis.
-"""
-    }
-]
-
-
-response = client.invoke_model(
-    modelId="anthropic.claude-3-haiku-20240307-v1:0",
-    contentType="application/json",
-    accept="application/json",
-    body=json.dumps({
-        "messages": messages,
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": 2048,
-        "temperature": 0.0
-    })
-)
 
-result = json.loads(response["body"].read().decode("utf-8"))
 st.markdown("**AI Recommendation:**")
-st.write(result["content"][0]["text"])
+ai_recommendation = st.write_stream(stream(messages, model=FAST_MODEL, max_tokens=2048, temperature=0.0))
 
-st.session_state["time_series_summary"] = result["content"][0]["text"]
+st.session_state["time_series_summary"] = ai_recommendation
 st.session_state["historical_snippet"] = historical_snippet
 st.session_state["forecast_snippet"] = forecast_snippet
\ No newline at end of file
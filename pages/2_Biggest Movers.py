@@ -1,7 +1,13 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-from modules.biggest_mover_functions import dma_change, prizm_change
+from modules.biggest_mover_functions import (
+    PERIOD_MODES, dma_change, mover_windows, period_change, prizm_change, ranked_movers, sliding_windows
+)
+from modules.page_processors import movers_summary_tables, summarize_movers
+from modules.data_store import load_prizm, load_table
+from modules.hit_cube import build_cube
+from modules.prizm_allocation import build_allocation, segment_daily_series
 
 # --- Page Setup ---
 st.set_page_config(layout="wide")
@@ -40,21 +46,23 @@ st.title("Biggest Movers")
 # --- Load data ---
 @st.cache_data
 def load_data():
-    df_peloton_grouped = pd.read_csv('PelotonDashboard/data/peloton_dma_grouped.csv')
-    df_peloton_grouped['date'] = pd.to_datetime(df_peloton_grouped['date'])
-
-    df_peloton = pd.read_csv('PelotonDashboard/data/peloton_dma.csv')
-    df_peloton['date'] = pd.to_datetime(df_peloton['date'])
+    df_peloton_grouped = load_table("peloton_dma_grouped", columns=['date', 'dma', 'action', 'hitCount'])
+    df_peloton = load_table("peloton_dma", columns=['date', 'dma', 'action', 'hitCount'])
 
-    df_prizm = pd.read_excel("PelotonDashboard/data/PRIZM2DMA.xlsx")
-    cols_to_pct = [col for col in df_prizm.columns if col != 'DMA_GCODE']
-    row_sums = df_prizm[cols_to_pct].sum(axis=1)
-    df_prizm[cols_to_pct] = df_prizm[cols_to_pct].div(row_sums, axis=0) * 100
+    df_prizm = load_prizm()
 
     return df_peloton_grouped, df_peloton, df_prizm
 
 df_peloton_grouped, df_peloton, df_prizm = load_data()
 
+# Read-only date x dma x action cubes and the DMA -> PRIZM allocation matrix, shared across sessions
+@st.cache_resource
+def load_cubes():
+    peloton_cube = build_cube(df_peloton)
+    return build_cube(df_peloton_grouped), peloton_cube, build_allocation(df_prizm, peloton_cube["dmas"])
+
+grouped_cube, peloton_cube, prizm_allocation = load_cubes()
+
 START_LIMIT = pd.to_datetime("2024-01-01")
 END_LIMIT = pd.to_datetime("2025-04-07")
 
@@ -71,26 +79,56 @@ with filter_col:
         index=0
     )
 
+    max_p_value = st.select_slider(
+        "Significance Level",
+        options=[0.001, 0.01, 0.05, 0.1, 1.0],
+        value=0.05,
+        help="Movers whose start vs end counts could be Poisson noise at this level are hidden. 1.0 shows everything."
+    )
+
+    comparison = st.selectbox(
+        "Comparison",
+        options=["Start Day vs Latest Day"] + list(PERIOD_MODES),
+        index=0,
+        help="Period modes compare summed windows ending on the latest day, so one noisy day can't flip the ranking."
+    )
+
     run_analysis = st.button("Run Analysis")
     show_map = st.checkbox("Show DMA Map", value=False, key="toggle_map")
 
 with content_col:
     if run_analysis:
+        action_filter = None if action == "Total Activity" else action
+        window_days = PERIOD_MODES.get(comparison)
+
         with st.spinner("Calculating..."):
-            dma_results = dma_change(
-                df=df_peloton_grouped,
-                start_date=start_date.strftime("%Y-%m-%d"),
-                end_date=None,
-                action=None if action == "Total Activity" else action or None
-            ).head(8)  
-
-            prizm_results = prizm_change(
-                df_peloton=df_peloton,
-                df_prizm=df_prizm,
-                start_date=start_date.strftime("%Y-%m-%d"),
-                end_date=None,
-                action=None if action == "Total Activity" else action or None
-            ).head(8) 
+            if window_days:
+                # Windows end on the last day of each cube's own data, as the Comparison help text says
+                dma_results = period_change([grouped_cube['dates'][-1]], window_days, action=action_filter,
+                                            cube=grouped_cube)['dma']
+                prizm_results = period_change([peloton_cube['dates'][-1]], window_days, action=action_filter,
+                                              cube=peloton_cube, allocation=prizm_allocation)['prizm']
+            else:
+                dma_results = dma_change(
+                    cube=grouped_cube,
+                    start_date=start_date.strftime("%Y-%m-%d"),
+                    end_date=None,
+                    action=None if action == "Total Activity" else action or None,
+                    sort=False
+                )
+                prizm_results = prizm_change(
+                    df_peloton=None,
+                    df_prizm=df_prizm,
+                    cube=peloton_cube,
+                    allocation=prizm_allocation,
+                    start_date=start_date.strftime("%Y-%m-%d"),
+                    end_date=None,
+                    action=None if action == "Total Activity" else action or None,
+                    sort=False
+                )
+
+            dma_results = ranked_movers(dma_results, max_p_value=max_p_value)
+            prizm_results = ranked_movers(prizm_results, max_p_value=max_p_value)
 
 
         col1, col2 = st.columns(2)
@@ -186,6 +224,35 @@ with content_col:
             st.pyplot(fig2)
 
 
+        # --- Weekly trajectory of each top mover's change since the start date
+        # (in period modes: the rolling period-over-period change at each weekly end date)
+        st.markdown("<div class='section-title'>Mover Trajectories</div>", unsafe_allow_html=True)
+        windows = sliding_windows(start_date.strftime("%Y-%m-%d"), END_LIMIT, step_days=7)
+        if window_days:
+            ends = [end for _, end in windows]
+            dma_trajectories = period_change(ends, window_days, action=action_filter, cube=grouped_cube)['dma']
+            prizm_trajectories = period_change(ends, window_days, action=action_filter,
+                                               cube=peloton_cube, allocation=prizm_allocation)['prizm']
+        else:
+            dma_trajectories = mover_windows(windows, action=action_filter, cube=grouped_cube)['dma']
+            prizm_trajectories = mover_windows(windows, action=action_filter, cube=peloton_cube, allocation=prizm_allocation)['prizm']
+
+        traj_col1, traj_col2 = st.columns(2)
+        with traj_col1:
+            st.line_chart(
+                dma_trajectories[dma_trajectories['dma'].isin(top_dma['dma'])]
+                    .pivot(index='end_date', columns='dma', values='weighted_pct_change')
+            )
+        with traj_col2:
+            st.line_chart(
+                prizm_trajectories[prizm_trajectories['segment'].isin(top_prizm['segment'])]
+                    .pivot(index='end_date', columns='segment', values='weighted_pct_change')
+            )
+
+        with st.expander("Daily PRIZM Segment Activity"):
+            segment_daily = segment_daily_series(peloton_cube, prizm_allocation, action_filter, start=start_date)
+            st.line_chart(segment_daily[top_prizm['segment'].tolist()])
+
         if show_map:
             st.markdown("<div class='section-title'>DMA Map</div>", unsafe_allow_html=True)
 
@@ -201,48 +268,10 @@ with content_col:
 st.markdown("<div style='border-top: 2px solid #74C2E1; margin: 10px 0 20px 0;'></div>", unsafe_allow_html=True)
 st.markdown("<div class='section-title'>AI Insight</div>", unsafe_allow_html=True)
 
-def summarize_movers(start_date, action_type, dma_df, prizm_df):
-    return [
-        {
-            "role": "user",
-            "content": f"""
-You are an expert marketing and business intelligence analyst.
-
-The following data reflects a comparison between activity levels starting from {start_date} for the action type "{action_type}". Metrics represent percent changes in engagement across DMA regions and PRIZM consumer segments.
-
-Top DMA Movers:
-{dma_df.to_markdown(index=False)}
-
-Top PRIZM Segment Movers:
-{prizm_df.to_markdown(index=False)}
-
-Please write an executive summary that includes:
-- The regions and segments with the largest gains and losses
-- Any geographic or demographic trends
-- Suggestions on how Peloton should respond to these shifts
-"""
-        }
-    ]
-
-import boto3
-import json
-from dotenv import load_dotenv
-import os
+from modules.llm_gateway import FAST_MODEL, stream
 
 # Format the top 5 rows of each mover DataFrame (you can adjust this number)
-dma_summary_df = dma_results[["dma", "start_count", "end_count", "weighted_pct_change"]].rename(columns={
-    "dma": "Region",
-    "start_count": "Start Count",
-    "end_count": "End Count",
-    "weighted_pct_change": "Adjusted Percent Change"
-}).head(5)
-
-prizm_summary_df = prizm_results[["segment", "start_count", "end_count", "weighted_pct_change"]].rename(columns={
-    "segment": "Segment",
-    "start_count": "Start Count",
-    "end_count": "End Count",
-    "weighted_pct_change": "Adjusted Percent Change"
-}).head(5)
+dma_summary_df, prizm_summary_df = movers_summary_tables(dma_results, prizm_results, n=5)
 
 # Build the Claude message prompt
 message = summarize_movers(
@@ -252,31 +281,9 @@ message = summarize_movers(
     prizm_df=prizm_summary_df
 )
 
-client = boto3.client(
-    "bedrock-runtime",
-    region_name="us-west-2",
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-    aws_session_token=os.getenv("AWS_SESSION_TOKEN")
-)
-
-# Claude API call
-response = client.invoke_model(
-    modelId="anthropic.claude-3-haiku-20240307-v1:0",
-    contentType="application/json",
-    accept="application/json",
-    body=json.dumps({
-        "messages": message,  # <-- Now a list of { role, content } objects
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": 2048,
-        "temperature": 0.5
-    })
-)
-
-result = json.loads(response["body"].read().decode("utf-8"))
-
-st.write(result["content"][0]["text"])
+# Claude API call, rendered as it streams in
+movers_summary = st.write_stream(stream(message, model=FAST_MODEL, max_tokens=2048, temperature=0.5))
 
-st.session_state["biggest_movers_summary"] = result["content"][0]["text"]
+st.session_state["biggest_movers_summary"] = movers_summary
 st.session_state["dma_movers"] = dma_summary_df
 st.session_state["prizm_movers"] = prizm_summary_df
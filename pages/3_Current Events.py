@@ -1,8 +1,7 @@
 import streamlit as st
-from modules.google_search import google_search_snippets
-from modules.reddit_search import search_reddit
-from modules.twitter_search import search_twitter
-from modules.youtube_search import search_youtube
+from modules.page_processors import EVENT_TOPICS, build_topic_prompt, combine_search_results
+from modules.result_processing import select_results
+from modules.search_orchestrator import SEARCH_SOURCES, stream_search
 from modules.chatbot import chat_with_claude
 import os
 import json
@@ -74,16 +73,12 @@ with open("PelotonDashboard/data/prizm_descriptions.json", "r", encoding="utf-8"
 prizm_lookup = {seg["name"]: seg for seg in prizm_data}
 
 # --- UI: Topic and PRIZM selectors
-topics = [
-    "Peloton",
-    "Fitness Industry",
-    "Home Fitness Industry",
-    "Biking Industry"
-]
+topics = EVENT_TOPICS
 selected_topic = st.selectbox("Select a topic to view its summary:", topics)
 segment_options = ["---"] + sorted(prizm_lookup.keys())
 selected_segment_name = st.selectbox("Select a PRIZM Segment:", segment_options)
 selected_segment = prizm_lookup.get(selected_segment_name)
+results_per_source = st.selectbox("Results per source:", [5, 10, 20, 30], index=0)
 
 
 # --- Generate content
@@ -91,6 +86,24 @@ if st.button("Generate Summaries for All Topics"):
     if "summaries" not in st.session_state:
         st.session_state["summaries"] = {}
 
+    # --- Run every topic x source search at once for the topics not summarized yet
+    new_topics = [topic for topic in topics if topic not in st.session_state["summaries"]]
+    search_output = {topic: {"results": {}, "errors": {}} for topic in new_topics}
+    if new_topics:
+        progress = st.empty()
+        found = 0
+        with st.spinner("Searching Google, Reddit, Twitter and YouTube..."):
+            # Pages arrive in completion order; show the running count while the rest are in flight
+            for page in stream_search(new_topics, depth=results_per_source, recency="365d"):
+                topic_search = search_output[page["topic"]]
+                if page["error"]:
+                    topic_search["errors"][page["source"]] = page["error"]
+                else:
+                    topic_search["results"].setdefault(page["source"], []).extend(page["results"])
+                    found += len(page["results"])
+                progress.caption(f"Collected {found} unique results so far...")
+        progress.empty()
+
     for topic in topics:
         with st.spinner(f"Fetching and analyzing content for: {topic}"):
             # --- Check if this topic already has a summary
@@ -98,61 +111,18 @@ if st.button("Generate Summaries for All Topics"):
                 topic_summary = st.session_state["summaries"][topic]["summary"]
                 all_results = st.session_state["summaries"][topic]["sources"]
             else:
-                # --- Run searches
-                google_results = google_search_snippets(topic, num_results=5, recency="qdr:y")
-                reddit_results = search_reddit(topic, num_results=5, recency="qdr:y")
-                twitter_results = search_twitter(topic, num_results=5, recency="qdr:y")
-                youtube_results = search_youtube(topic, num_results=5, recency="qdr:y")
-
-                # --- Combine results
-                all_results = []
-                for group, results in [
-                    ("Google", google_results),
-                    ("Reddit", reddit_results),
-                    ("Twitter", twitter_results),
-                    ("YouTube", youtube_results)
-                ]:
-                    for r in results:
-                        all_results.append({
-                            "source": group,
-                            "title": r.get("title", "Untitled"),
-                            "snippet": r.get("snippet", r.get("text", "")),
-                            "link": r.get("link", "")
-                        })
-
-                combined_text = "\n\n".join(
-                    f"[{r['source']}] {r['title']}\n{r['snippet']}\n{r['link']}" for r in all_results
-                )
-
-                # --- Main summary prompt
-                topic_prompt = f"""
-You are a professional market intelligence analyst. Your job is to analyze recent content from social media, forums, and the web to extract key insights that would be useful for a business leader.
-
-Below is content related to "{topic}". Your output must follow these rules:
-
-1. Identify the **5 most relevant current events or trends** that appear across the sources.
-2. For each, create a short **title** (like a headline), followed by **1-2 sentences** explaining the event in plain language.
-3. Use clear, concise, and professional language.
-4. Avoid speculation. Only summarize what can reasonably be inferred from the sources.
-5. Reference the list of sources directly and supply a date to see recency.
-6. Order news from most recent to oldest.
-7. Use **bold** for the titles of each event.
-8. Use *italics* for the source names.
-9. Use **bullet points** for each event.
-10. Do not add anything else to output besides the summaries.
+                # --- Combine results (sources that failed or timed out are skipped)
+                topic_search = search_output[topic]
+                for group, error in topic_search["errors"].items():
+                    st.warning(f"{group} search for {topic} failed: {error}")
 
-Make the result visually scannable and useful for brainstorming decisions or strategies. Example format:
+                all_results = combine_search_results(topic_search, SEARCH_SOURCES)
 
-**1. Peloton Loses 3 Five-Star Instructors**
+                # --- Keep the most relevant, non-duplicate results within the prompt's token budget
+                all_results = select_results(all_results, topic)
 
-Peloton recently parted ways with several top instructors, sparking concern among its loyal user base and raising questions about company culture and retention.
-(Google 2023-10-01 with link to url used)
-
-**Sources:**
-
-- Remember to include the source name, title, and link for each event.
-{combined_text}
-"""
+                # --- Main summary prompt
+                topic_prompt = build_topic_prompt(topic, all_results)
                 topic_summary = chat_with_claude(topic_prompt)
 
             # --- PRIZM analysis (always rerun with selected segment)